@@ -0,0 +1,144 @@
+"""Micro-benchmark for OCR page layout.
+
+Compares the previous pandas/iterrows implementation of OCR.post_processing with
+documents.layout.lines_to_text on dense synthetic pages and checks both produce the same text,
+then compares prompt size of the "lines" layout with the word-level "words" layout.
+Token counts use tiktoken's cl100k_base when it is installed, otherwise roughly 4 characters per token.
+
+    cd LLM && python -m benchmarks.post_processing_benchmark --lines 100 300 600
+"""
+import argparse
+import random
+import time
+import pandas as pd
+from documents.layout import lines_to_text, words_to_text
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except ImportError:
+    _encoding = None
+
+
+def count_tokens(text):
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return round(len(text) / 4)
+
+
+def legacy_post_processing(line_info, space_difference_threshold=15):
+    data = pd.DataFrame(line_info)
+    data['mean'] = data['bbox'].apply(lambda x: (sum(x[::2]) / 4, sum(x[1::2]) / 4))
+    data['line_number'] = -1
+    line = 0
+    min_x = 1000
+    variations = 20
+    considered_index = []
+    for index, row in data.iterrows():
+        x_coordinates = row['bbox'][::2]
+        min_x = min(min(x_coordinates), min_x)
+        if index in considered_index:
+            continue
+        line = line + 1
+        data.at[index, 'line_number'] = line
+        y = row['mean'][1]
+        for index2, row2 in data.iterrows():
+            if index2 in considered_index:
+                continue
+            if index >= index2:
+                continue
+            if abs(y - row2['mean'][1]) < variations:
+                considered_index.append(index2)
+                data.at[index2, 'line_number'] = line
+    data['x'] = data['mean'].apply(lambda x: x[0])
+    data = data.sort_values(by=['line_number', 'x'], ascending=[True, True], na_position='first')
+    text = ''
+    for index, each in list(data.groupby(by='line_number')):
+        temp_text = ''
+        for i in range(0, each.shape[0]):
+            prev_word_end = min_x if i == 0 else each.iloc[i - 1]['bbox'][2]
+            space_diff = each.iloc[i]['bbox'][0] - prev_word_end
+            if space_diff > space_difference_threshold:
+                temp_text += ' ' * int(space_diff / space_difference_threshold)
+            temp_text += each.iloc[i]['line']
+        text = text + temp_text + "\n"
+    return text
+
+
+def synthetic_page(line_count, seed=0, width=2000):
+    """Azure-style lines and words laid out as a dense multi-column form with slight skew and jitter."""
+    rng = random.Random(seed)
+    lines = []
+    words = []
+    y = 40.0
+    while len(lines) < line_count:
+        x = rng.uniform(20, 120)
+        for _ in range(rng.randint(1, 5)):
+            if len(lines) >= line_count or x > width - 200:
+                break
+            text = " ".join(rng.choice(["Account", "Name", "IBAN", "AED", "12,500.00", "Dubai", "Date:", "Branch"])
+                            for _ in range(rng.randint(1, 4)))
+            w = 14 * len(text)
+            h = rng.uniform(22, 30)
+            top = y + rng.uniform(-6, 6)
+            skew = rng.uniform(-2, 2)
+            lines.append({
+                "line": text,
+                "bbox": [x, top, x + w, top + skew, x + w, top + h + skew, x, top + h],
+            })
+            word_x = x
+            for token in text.split(" "):
+                word_w = 14 * len(token)
+                words.append({
+                    "word": token,
+                    "bbox": [word_x, top, word_x + word_w, top, word_x + word_w, top + h, word_x, top + h],
+                    "line_number": len(lines),
+                })
+                word_x += word_w + 14
+            x += w + rng.uniform(20, 300)
+        y += rng.uniform(28, 45)
+    rng.shuffle(lines)
+    return {"line": lines, "words": words}
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, nargs="+", default=[50, 150, 300, 600])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seeds", type=int, default=5, help="pages checked for identical output per size")
+    args = parser.parse_args()
+
+    print(f"{'lines':>6} {'legacy ms':>10} {'numpy ms':>10} {'speed-up':>9}")
+    for count in args.lines:
+        for seed in range(1, args.seeds):
+            lines = synthetic_page(count, seed)["line"]
+            assert legacy_post_processing(lines) == lines_to_text(lines), f"output differs (lines={count}, seed={seed})"
+
+        lines = synthetic_page(count)["line"]
+        legacy_time, legacy_text = best_of(lambda: legacy_post_processing(lines), args.repeat)
+        numpy_time, numpy_text = best_of(lambda: lines_to_text(lines), args.repeat)
+        assert legacy_text == numpy_text, f"output differs (lines={count})"
+        print(f"{count:>6} {legacy_time * 1000:>10.1f} {numpy_time * 1000:>10.2f} {legacy_time / numpy_time:>8.0f}x")
+
+    print()
+    print(f"{'lines':>6} {'lines tok':>10} {'words tok':>10} {'saved':>7} {'words ms':>9}")
+    for count in args.lines:
+        page = synthetic_page(count)
+        words_time, words_text = best_of(lambda: words_to_text(page["words"]), args.repeat)
+        lines_tokens = count_tokens(lines_to_text(page["line"]))
+        words_tokens = count_tokens(words_text)
+        saved = 1 - words_tokens / lines_tokens
+        print(f"{count:>6} {lines_tokens:>10} {words_tokens:>10} {saved:>6.0%} {words_time * 1000:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
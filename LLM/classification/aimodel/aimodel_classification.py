@@ -1,29 +1,49 @@
 from classification.Classify import Classify
-from utils.llm import openai_client, gemini_model
+from utils.llm import openai_client, gemini_model, CLASSIFICATION_TEMPERATURE
 from utils.log import logger
+from utils import llm_cache, metrics, prompt_cache, template_cache
 from utils.prompt import (
     aimodel_classify_promt_level1,
- 
+    aimodel_classify_batch_promt_level1,
 )
+from dotenv import load_dotenv
+import json
 import os
+import re
+
+load_dotenv()
+
+# Pages classified per request. 1 keeps one request per page; larger values send the OCR
+# text of several pages in one request, capped at CLASSIFICATION_BATCH_MAX_CHARS of OCR text.
+CLASSIFICATION_BATCH_SIZE = int(os.getenv("CLASSIFICATION_BATCH_SIZE", 1))
+CLASSIFICATION_BATCH_MAX_CHARS = int(os.getenv("CLASSIFICATION_BATCH_MAX_CHARS", 24000))
 
 
 class AIMODELClassifier(Classify):
-    def __init__(self, document, model):
+    def __init__(self, document, model, local_classifiers=None):
         super().__init__(document, model, None)
         self.model = model  
+        # Optional local first stages (trained page model, template TF-IDF), tried in order;
+        # pages one of them is confident about skip the LLM.
+        self.local_classifiers = local_classifiers or []
 
-    def define_prompt(self, templates, level=1):
-        customer_type = {
-            str(template.get("customer_type", "")).lower()
-            for template in templates
-        }
+    def define_prompt(self, templates, level=1, batch=False):
+        SYSTEMP_PROMT, class_name = prompt_cache.compiled_prompt(
+            "classification", templates, (level, batch),
+            lambda: self.build_prompt(templates, level=level, batch=batch),
+        )
+        if SYSTEMP_PROMT is not None:
+            self.class_name = list(class_name)
+            logger.info("Classification:: STEP 1: Classification Prompt formatted and sent to model")
+        return SYSTEMP_PROMT
 
-        is_individual = "individual" in customer_type
+    def build_prompt(self, templates, level=1, batch=False):
+        """(prompt, class names) for a template set; (None, None) when no prompt applies."""
+        is_individual = self.template_customer_type(templates) == "individual"
 
         if is_individual:
             if level == 1:
-                SYSTEMP_PROMT = aimodel_classify_promt_level1()
+                SYSTEMP_PROMT = aimodel_classify_batch_promt_level1() if batch else aimodel_classify_promt_level1()
                 template_info = {
                     template["document_name"]: template.get("description", "")
                     for template in templates
@@ -37,32 +57,60 @@ class AIMODELClassifier(Classify):
                 class_label = "\n".join(
                     [f"{class_name}, " for class_name in template_info]
                 )
-                self.class_name = list(template_info.keys())
                 SYSTEMP_PROMT = SYSTEMP_PROMT.format(
                     template_definition=formatted_string,
                     class_name=class_label
                 )
-                logger.info("Classification:: STEP 1: Classification Prompt formatted and sent to model")
-                return SYSTEMP_PROMT
+                return SYSTEMP_PROMT, tuple(template_info.keys())
+        return None, None
+
+    def template_customer_type(self, templates):
+        """"individual" when any template targets individual customers, else "non-individual"."""
+        def build():
+            customer_type = {
+                str(template.get("customer_type", "")).lower()
+                for template in templates
+            }
+            return "individual" if "individual" in customer_type else "non-individual"
+        return template_cache.derived_value("customer_type", templates, None, build)
+
+    def completion_GEMINI(self, messages):
+        """Raw Gemini response text for chat-style messages, served from the LLM cache when possible."""
+        text_parts = []
+        for m in messages:
+            if m["role"] == "user":
+                for content in m.get("content", []):
+                    if content["type"] == "text":
+                        text_parts.append(str(content.get("text") or ""))
+            elif m["role"] == "system":
+                text_parts.append(f"System Instruction: {str(m.get('content') or '')}")
+
+        prompt = "\n\n".join(text_parts)
+
+        return llm_cache.cached_completion(
+            "gemini", os.getenv("GEMINI_MODEL"), CLASSIFICATION_TEMPERATURE, messages,
+            lambda: gemini_model.generate_content(
+                prompt, generation_config={"temperature": CLASSIFICATION_TEMPERATURE}
+            ).text,
+        )
+
+    def completion_OPENAI(self, messages):
+        """Raw OpenAI response text for the messages, served from the LLM cache when possible."""
+        model_name = os.getenv("OPENAI_CLASSIFICATION_MODEL")
+        return llm_cache.cached_completion(
+            "openai", model_name, CLASSIFICATION_TEMPERATURE, messages,
+            lambda: openai_client.chat.completions.create(
+                model=model_name,
+                messages=messages,
+                temperature=CLASSIFICATION_TEMPERATURE,
+                max_tokens=2048,
+            ).choices[0].message.content,
+        )
 
-  
-        
     def prediction_GEMINI(self, messages, level):
         try:
             logger.info("Classification:: Sending request to Gemini model")
-            text_parts = []
-            for m in messages:
-                if m["role"] == "user":
-                    for content in m.get("content", []):
-                        if content["type"] == "text":
-                            text_parts.append(str(content.get("text") or ""))
-                elif m["role"] == "system":
-                    text_parts.append(f"System Instruction: {str(m.get('content') or '')}")
-
-            prompt = "\n\n".join(text_parts)
-
-            response = gemini_model.generate_content(prompt)
-            output_text = response.text
+            output_text = self.completion_GEMINI(messages)
 
             logger.info(f"Classification:: Gemini result:: {output_text}")
             return self.response_cleaning(output_text, level=level)
@@ -75,13 +123,7 @@ class AIMODELClassifier(Classify):
     def prediction_OPENAI(self, messages, level):
         try:
             logger.info("Classification:: Sending request to OpenAI model")
-            response = openai_client.chat.completions.create(
-                model=os.getenv("OPENAI_CLASSIFICATION_MODEL"),
-                messages=messages,
-                temperature=0.3,
-                max_tokens=2048,
-            )
-            output_text = response.choices[0].message.content
+            output_text = self.completion_OPENAI(messages)
             logger.info(f"Classification:: STEP 2: Classification result received from OpenAI  {output_text}")
             classification_result = self.response_cleaning(output_text, level=level)
             return classification_result
@@ -92,54 +134,215 @@ class AIMODELClassifier(Classify):
 
     def classify_pages(self, templates, level=None):  
         level = level or 1
-        model = self.model  
 
         if self.document is not None:
-            for page_number, image in self.document.pagewise_images.items():
-                customer_type = {
-                    str(template.get("customer_type", "")).lower()
-                    for template in templates
-                }
-                is_individual = "individual" in customer_type
-                self.document.page_customer_type[page_number] = (
-                    "individual" if is_individual else "non-individual"
-                )
+            page_numbers = [
+                page_number for page_number in self.document.pagewise_images
+                if not self.classify_page_locally(page_number, templates, level)
+            ]
+            if CLASSIFICATION_BATCH_SIZE > 1:
+                for batch in self.page_batches(page_numbers):
+                    self.classify_page_batch(batch, templates, level)
+            else:
+                for page_number in page_numbers:
+                    self.classify_page_number(page_number, templates, level, local=False)
+
+    def classify_page_locally(self, page_number, templates, level=None):
+        """Classify a page with the local first stages; False when it has to go to the LLM."""
+        if not self.local_classifiers:
+            return False
+        ocr_text = self.page_ocr_text(page_number)
+        class_names = {template.get("document_name") for template in templates}
+        for classifier in self.local_classifiers:
+            prediction = classifier.classify(ocr_text, class_names)
+            if prediction is None:
+                continue
+
+            class_name, score = prediction
+            self.set_page_customer_type(page_number, templates)
+            self.document.classify_page(page_number, {
+                "class_name": class_name,
+                "score": score,
+                "technique": f"{classifier.technique} - level {level or 1}",
+            })
+            metrics.increment(f"classification.routed.{classifier.technique}")
+            logger.info(f"Classification:: Page {page_number} classified by {classifier.technique} as {class_name} ({score})")
+            return True
+
+        return False
+
+    def set_page_customer_type(self, page_number, templates):
+        self.document.page_customer_type[page_number] = self.template_customer_type(templates)
+
+    def page_ocr_text(self, page_number):
+        ocr_text = self.document.pagewise_text.get(page_number, [])
+        ocr_text_str = ""
+        if ocr_text:
+            if isinstance(ocr_text[0], dict) and "text" in ocr_text[0]:
+                ocr_text_str = ocr_text[0]["text"]
+            elif isinstance(ocr_text[0], str):
+                ocr_text_str = ocr_text[0]
+        return ocr_text_str
+
+    def page_batches(self, page_numbers):
+        """Group pages in document order into batches of CLASSIFICATION_BATCH_SIZE pages and
+        at most CLASSIFICATION_BATCH_MAX_CHARS of OCR text (a longer page gets a batch of its own)."""
+        batch = []
+        batch_chars = 0
+        for page_number in page_numbers:
+            page_chars = len(self.page_ocr_text(page_number))
+            if batch and (len(batch) >= CLASSIFICATION_BATCH_SIZE or batch_chars + page_chars > CLASSIFICATION_BATCH_MAX_CHARS):
+                yield batch
+                batch = []
+                batch_chars = 0
+            batch.append(page_number)
+            batch_chars += page_chars
+        if batch:
+            yield batch
+
+    def parse_batch_response(self, output_text, page_numbers):
+        """{page_number: class_name} for the pages the model answered with a known class."""
+        cleaned = re.sub(r"^```(?:json)?|```$", "", output_text.strip()).strip()
+        answer = json.loads(cleaned)
+        if not isinstance(answer, dict):
+            raise ValueError("batch classification answer is not a JSON object")
+
+        classes = set(self.class_name) | {"Others"}
+        results = {}
+        for page_number in page_numbers:
+            class_name = answer.get(str(page_number))
+            if isinstance(class_name, str) and class_name.strip() in classes:
+                results[page_number] = class_name.strip()
+        return results
+
+    def classify_page_batch(self, page_numbers, templates, level=None):
+        """Classify several pages with one request; pages without a usable answer fall back to per-page calls."""
+        level = level or 1
+        if len(page_numbers) == 1:
+            self.classify_page_number(page_numbers[0], templates, level, local=False)
+            return
+
+        for page_number in page_numbers:
+            self.set_page_customer_type(page_number, templates)
+
+        pages_text = "\n\n".join(
+            f"### Page {page_number}\n{self.page_ocr_text(page_number).strip()}" for page_number in page_numbers
+        )
+        messages = [
+            {
+                "role": "system",
+                "content": (
+                    "You are a document classification assistant. Use the user input and classification prompt "
+                    "to classify every page of the document. Provide one class name per page from the list of classes "
+                    "provided in the user prompt, as a JSON object keyed by page number."
+                ),
+            },
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": f"OCR Text:\n{pages_text}"},
+                    {"type": "text", "text": self.define_prompt(templates, level=level, batch=True)},
+                ],
+            },
+        ]
+
+        results = {}
+        try:
+            with metrics.timer("classification.llm_batch"):
+                if self.model == "openai":
+                    output_text = self.completion_OPENAI(messages)
+                elif self.model == "gemini":
+                    output_text = self.completion_GEMINI(messages)
+                else:
+                    logger.error(f"Classification:: Unsupported model type: {self.model}")
+                    return
+            metrics.increment("classification.batch.requests")
+            logger.info(f"Classification:: Batch result for pages {page_numbers}:: {output_text}")
+            results = self.parse_batch_response(output_text, page_numbers)
+        except Exception as e:
+            logger.warning(f"Classification:: Batch classification failed for pages {page_numbers}, classifying per page: {e}")
+
+        for page_number in page_numbers:
+            if page_number in results:
+                metrics.increment("classification.routed.llm")
+                self.document.classify_page(page_number, self.response_cleaning(results[page_number], level=level))
+            else:
+                metrics.increment("classification.batch.fallback_pages")
+                self.classify_page_number(page_number, templates, level, local=False)
+
+    def classify_page_number(self, page_number, templates, level=None, local=True):
+        """Classify a single page of the document, trying the local first stage unless `local` is False."""
+        level = level or 1
+        model = self.model  
+
+        if local and self.classify_page_locally(page_number, templates, level):
+            return
+
+        metrics.increment("classification.routed.llm")
+
+        self.set_page_customer_type(page_number, templates)
+        ocr_text_str = self.page_ocr_text(page_number)
+
+        messages = [
+            {
+                "role": "system",
+                "content": (
+                    "You are a document classification assistant. Use the user input and classification prompt "
+                    "to classify the document. Provide a single class name from the list of classes provided in the user prompt."
+                ),
+            },
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": f"OCR Text:\n{ocr_text_str.strip()}"},
+                    {"type": "text", "text": self.define_prompt(templates, level=level)},
+                ],
+            },
+        ]
+
+        try:
+            with metrics.timer("classification.llm"):
+                if model == "openai":
+                    classification_result = self.prediction_OPENAI(messages, level)
+                elif model == "gemini":
+                    classification_result = self.prediction_GEMINI(messages, level)
+                else:
+                    logger.error(f"Classification:: Unsupported model type: {model}")
+                    return
+
+            self.document.classify_page(page_number, classification_result)
+
+        except Exception as e:
+            logger.error(f"Classification:: Error classifying page {page_number}: {e}")
+
+
+def routing_stats():
+    """Pages classified by each local stage versus the LLM, and the LLM time the local stages saved."""
+    llm_pages = metrics.get_counter("classification.routed.llm")
+    # Per-page LLM cost over single-page and batched requests alike.
+    llm_seconds = sum(
+        metrics.get_timing(name)["total_seconds"] for name in ("classification.llm", "classification.llm_batch")
+    )
+    llm_avg = llm_seconds / llm_pages if llm_pages else 0.0
+    stats = {
+        "llm_pages": llm_pages,
+        "fused_pages": metrics.get_counter("classification.routed.fused"),
+        "avg_llm_seconds": llm_avg,
+    }
+    saved = 0.0
+    local_pages = 0.0
+    for technique in ("page_model", "tfidf"):
+        pages = metrics.get_counter(f"classification.routed.{technique}")
+        timing = metrics.get_timing(f"classification.{technique}")
+        avg = timing["total_seconds"] / timing["count"] if timing["count"] else 0.0
+        stats[f"{technique}_pages"] = pages
+        stats[f"avg_{technique}_seconds"] = avg
+        saved += pages * max(0.0, llm_avg - avg)
+        local_pages += pages
+    total = local_pages + stats["llm_pages"] + stats["fused_pages"]
+    stats["local_share"] = local_pages / total if total else 0.0
+    stats["estimated_seconds_saved"] = saved
+    return stats
+
 
-                ocr_text = self.document.pagewise_text.get(page_number, [])
-                ocr_text_str = ""
-                if ocr_text:
-                    if isinstance(ocr_text[0], dict) and "text" in ocr_text[0]:
-                        ocr_text_str = ocr_text[0]["text"]
-                    elif isinstance(ocr_text[0], str):
-                        ocr_text_str = ocr_text[0]
-
-                messages = [
-                    {
-                        "role": "system",
-                        "content": (
-                            "You are a document classification assistant. Use the user input and classification prompt "
-                            "to classify the document. Provide a single class name from the list of classes provided in the user prompt."
-                        ),
-                    },
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": f"OCR Text:\n{ocr_text_str.strip()}"},
-                            {"type": "text", "text": self.define_prompt(templates, level=level)},
-                        ],
-                    },
-                ]
-
-                try:
-                    if model == "openai":
-                        classification_result = self.prediction_OPENAI(messages, level)
-                    elif model == "gemini":
-                        classification_result = self.prediction_GEMINI(messages, level)
-                    else:
-                        logger.error(f"Classification:: Unsupported model type: {model}")
-                        continue
-
-                    self.document.classify_page(page_number, classification_result)
-
-                except Exception as e:
-                    logger.error(f"Classification:: Error classifying page {page_number}: {e}")
+metrics.register_gauge("classification.routing", routing_stats)
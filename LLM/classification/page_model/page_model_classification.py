@@ -0,0 +1,68 @@
+import os
+import threading
+import time
+from dotenv import load_dotenv
+from utils import metrics
+from utils.log import logger
+
+load_dotenv()
+
+# Page classifier trained offline from past results (backend: python -m app.services.page_classifier train).
+# "ahead" answers pages it is confident about and sends the rest to the LLM, "replace" answers every
+# page it can, "off" disables it.
+PAGE_CLASSIFIER_MODE = os.getenv("PAGE_CLASSIFIER_MODE", "off").lower()
+PAGE_CLASSIFIER_MODEL_PATH = os.getenv("PAGE_CLASSIFIER_MODEL_PATH", "models/page_classifier.joblib")
+PAGE_CLASSIFIER_THRESHOLD = float(os.getenv("PAGE_CLASSIFIER_THRESHOLD", 0.8))
+
+_model = None
+_model_lock = threading.Lock()
+
+
+class PageModelClassifier:
+    technique = "page_model"
+
+    def __init__(self, bundle, mode):
+        self.pipeline = bundle["pipeline"]
+        self.trained_at = bundle.get("trained_at")
+        self.mode = mode
+
+    def predict(self, text, class_names=None):
+        """(class_name, probability) when the prediction may be used for this request, otherwise None."""
+        if not text or not text.strip():
+            return None
+        probabilities = self.pipeline.predict_proba([text])[0]
+        best = probabilities.argmax()
+        class_name = str(self.pipeline.classes_[best])
+        score = float(probabilities[best])
+        # The model may know classes the current templates no longer offer.
+        if class_names is not None and class_name not in class_names:
+            return None
+        if self.mode == "ahead" and score < PAGE_CLASSIFIER_THRESHOLD:
+            return None
+        return class_name, round(score, 4)
+
+    def classify(self, text, class_names=None):
+        start = time.perf_counter()
+        prediction = self.predict(text, class_names)
+        metrics.observe("classification.page_model", time.perf_counter() - start)
+        return prediction
+
+
+def get_page_classifier():
+    """The trained page classifier, loaded once per process; None when disabled or missing."""
+    global _model
+    if PAGE_CLASSIFIER_MODE not in ("ahead", "replace"):
+        return None
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                try:
+                    import joblib
+                    bundle = joblib.load(PAGE_CLASSIFIER_MODEL_PATH)
+                    _model = PageModelClassifier(bundle, PAGE_CLASSIFIER_MODE)
+                    logger.info(f"Page classifier loaded from {PAGE_CLASSIFIER_MODEL_PATH} "
+                                f"(trained {_model.trained_at}, mode {PAGE_CLASSIFIER_MODE})")
+                except Exception as error:
+                    logger.error(f"Could not load page classifier from {PAGE_CLASSIFIER_MODEL_PATH}: {error}")
+                    _model = False
+    return _model or None
@@ -0,0 +1,76 @@
+import os
+import time
+from dotenv import load_dotenv
+from sklearn.feature_extraction.text import TfidfVectorizer
+from utils import metrics, template_cache
+from utils.log import logger
+
+load_dotenv()
+
+# First-stage classifier built from the template keywords, features and descriptions. A page is
+# only sent to the LLM classifier when the local prediction is not confident enough.
+TFIDF_CLASSIFIER_ENABLED = os.getenv("TFIDF_CLASSIFIER_ENABLED", "false").lower() == "true"
+TFIDF_CONFIDENCE_THRESHOLD = float(os.getenv("TFIDF_CONFIDENCE_THRESHOLD", 0.3))
+# Minimum lead of the best class over the runner-up, so near-ties still go to the LLM.
+TFIDF_MIN_MARGIN = float(os.getenv("TFIDF_MIN_MARGIN", 0.1))
+# Keywords are the most specific signal a template has; repeat them to weigh them up.
+TFIDF_KEYWORD_WEIGHT = int(os.getenv("TFIDF_KEYWORD_WEIGHT", 3))
+
+
+class tfIDFTemplateClassifier:
+    technique = "tfidf"
+
+    def __init__(self, template_data):
+        """Fit a TF-IDF profile per document class from get_templates() items."""
+        self.class_names = []
+        corpus = []
+        for item in template_data:
+            text = self.class_text(item)
+            if item.get("document_name") and text.strip():
+                self.class_names.append(item["document_name"])
+                corpus.append(text)
+
+        self.vectorizer = None
+        if len(self.class_names) > 1:
+            self.vectorizer = TfidfVectorizer(sublinear_tf=True, ngram_range=(1, 2), stop_words="english")
+            self.class_vectors = self.vectorizer.fit_transform(corpus)
+        logger.info(f"TF-IDF classifier built for {len(self.class_names)} classes")
+
+    def class_text(self, item):
+        parts = [item.get("document_name") or "", item.get("features") or ""]
+        for template in item.get("templates", []):
+            parts.append(template.get("describe_document") or "")
+            parts.append(template.get("description") or "")
+            keywords = (template.get("keywords") or "").replace(",", " ")
+            parts.extend([keywords] * TFIDF_KEYWORD_WEIGHT)
+        return "\n".join(parts)
+
+    def predict(self, text, class_names=None):
+        """(class_name, score) when confident, otherwise None."""
+        if self.vectorizer is None or not text or not text.strip():
+            return None
+
+        # Rows are L2-normalised, so the dot product is the cosine similarity.
+        scores = (self.class_vectors @ self.vectorizer.transform([text]).T).toarray().ravel()
+        ranked = scores.argsort()[::-1]
+        best = float(scores[ranked[0]])
+        runner_up = float(scores[ranked[1]])
+        class_name = self.class_names[ranked[0]]
+        if class_names is not None and class_name not in class_names:
+            return None
+        if best >= TFIDF_CONFIDENCE_THRESHOLD and best - runner_up >= TFIDF_MIN_MARGIN:
+            return class_name, round(best, 4)
+        return None
+
+    def classify(self, text, class_names=None):
+        start = time.perf_counter()
+        prediction = self.predict(text, class_names)
+        metrics.observe("classification.tfidf", time.perf_counter() - start)
+        return prediction
+
+
+def get_template_classifier(template_data):
+    """Shared classifier for this template set, built once per template version; None when disabled."""
+    if not TFIDF_CLASSIFIER_ENABLED or not template_data:
+        return None
+    return template_cache.derived_value("tfidf", template_data, None, lambda: tfIDFTemplateClassifier(template_data))
@@ -6,19 +6,23 @@ from classification import Classify
 from extraction import Extraction
 from utils.log import logger
 from extraction.aimodel.aimodel_extraction import AIMODELExtractor
+from extraction.aimodel.aimodel_fused_extraction import AIMODELFusedExtractor, PIPELINE_MODE
+from extraction.extraction_planner import log_plan
 from classification.aimodel.aimodel_classification import AIMODELClassifier
+from classification.tfidf.tfidf_classification import get_template_classifier
+from classification.page_model.page_model_classification import get_page_classifier
 from utils.payload_processing import get_entities
+from utils.executor import map_llm_pages
 import json
 from dotenv import load_dotenv
 load_dotenv()
 import os
 
 class DocExtractor:
-    def __init__(self, file):
+    def __init__(self, filename, file_bytes):
         """Initialize DocExtractor with a file in bytes format and attempt to create the appropriate document object."""
         self.document = None
-        file_bytes=file.read()
-        file_extension = file.filename.rsplit('.', 1)[-1].lower()
+        file_extension = filename.rsplit('.', 1)[-1].lower()
         
         if file_extension=="pdf":
             try:
@@ -38,6 +42,9 @@ class DocExtractor:
         else:
             logger.error(f"Unsupported file format: {file_extension}")
 
+        if self.document is not None:
+            self.document.upload_name = filename
+
     def get_results(self):
         """Retrieve the classification and extraction results."""
         return {
@@ -49,11 +56,18 @@ class DocExtractor:
         """Retrieve the initialized document object."""
         return self.document
     
-    def get_classification_extraction(self, formatted_data_for_prompt):
-        global template_classifier
-
+    def get_classification_extraction(self, formatted_data_for_prompt, local_classifiers=None):
         classification_model_company = os.getenv("CLASSIFICATION_MODEL_COMPANY")
-        classifier_model = AIMODELClassifier(self.document, classification_model_company)
+        classifier_model = AIMODELClassifier(self.document, classification_model_company, local_classifiers)
+        if PIPELINE_MODE == "fused":
+            fused_model = AIMODELFusedExtractor(self.document, os.getenv("EXTRACTION_MODEL_COMPANY"), classifier_model)
+            pages = [(page_number, formatted_data_for_prompt) for page_number in self.document.pagewise_images]
+            for _ in map_llm_pages(fused_model.process_page, pages):
+                pass
+            log_plan(self.document)
+            self.document.unify_extraction()
+            return
+
         classifier_model.classify_pages(formatted_data_for_prompt)
         self.document.unify_classification(formatted_data_for_prompt) 
 
@@ -61,37 +75,96 @@ class DocExtractor:
         extraction_model_company=os.getenv("EXTRACTION_MODEL_COMPANY")
         ner_model = AIMODELExtractor(self.document,extraction_model_company)  
         ner_model.extract_pages(formatted_data_for_prompt)
+        log_plan(self.document)
         self.document.unify_extraction()
 
+    def iter_page_results(self, formatted_data_for_prompt, local_classifiers=None):
+        """Classify and extract page by page, yielding (page_number, page_details) as each page finishes."""
+        classifier_model = AIMODELClassifier(self.document, os.getenv("CLASSIFICATION_MODEL_COMPANY"), local_classifiers)
+        ner_model = AIMODELExtractor(self.document, os.getenv("EXTRACTION_MODEL_COMPANY"))
+        if PIPELINE_MODE == "fused":
+            ner_model = AIMODELFusedExtractor(self.document, os.getenv("EXTRACTION_MODEL_COMPANY"), classifier_model)
+        considered_entities = []
+
+        def process_page(page_number):
+            try:
+                if PIPELINE_MODE == "fused":
+                    ner_model.process_page(page_number, formatted_data_for_prompt)
+                    return None
+                classifier_model.classify_page_number(page_number, formatted_data_for_prompt)
+                self.document.unify_page_classification(page_number)
+                ner_model.extract_page(page_number, formatted_data_for_prompt)
+            except Exception as error:
+                return error
+            return None
+
+        # Pages are classified and extracted concurrently; cross-page unification and the
+        # results still follow the page order.
+        pages = [(page_number,) for page_number in self.document.pagewise_images]
+        for (page_number,), error in zip(pages, map_llm_pages(process_page, pages)):
+            try:
+                if error is not None:
+                    raise error
+                self.document.unify_page_extraction(page_number, considered_entities)
+
+                yield page_number, self.document.get_single_page_details(page_number)
+            except Exception as error:
+                logger.error(f"Streaming:: page {page_number} failed: {error}")
+                yield page_number, {"error": str(error)}
+        log_plan(self.document)
 
 
 
-def start_doc_extractor(file, template_data):
-    global template_classifier
-    if file:
+
+def start_doc_extractor(filename, file_bytes, template_data):
+    if file_bytes:
+        template_classifier = None
         if template_data:
-            if extract_templates(template_data, False):
+            template_classifier = extract_templates(template_data)
+            if template_classifier:
                 logger.info("UI Templates extracted successfully")
 
         entitie_data, _ = get_entities(template_data)
         formatted_data_for_prompt = entitie_data['data']
 
-        doc_extractor = DocExtractor(file)
-        doc_extractor.get_classification_extraction(formatted_data_for_prompt)
+        doc_extractor = DocExtractor(filename, file_bytes)
+        doc_extractor.get_classification_extraction(formatted_data_for_prompt, local_classifiers(template_classifier))
         
         extracted_page_details = doc_extractor.document.get_page_details()
         
         return extracted_page_details
 
 
+def stream_doc_extractor(filename, file_bytes, template_data):
+    """Generator variant of start_doc_extractor that yields each page's result as soon as it is ready."""
+    if file_bytes:
+        template_classifier = None
+        if template_data:
+            template_classifier = extract_templates(template_data)
+            if template_classifier:
+                logger.info("UI Templates extracted successfully")
+
+        entitie_data, _ = get_entities(template_data)
+        formatted_data_for_prompt = entitie_data['data']
+
+        doc_extractor = DocExtractor(filename, file_bytes)
+        if doc_extractor.document is None:
+            raise RuntimeError(f"Could not open document {filename}")
+
+        yield from doc_extractor.iter_page_results(formatted_data_for_prompt, local_classifiers(template_classifier))
+
+
+
+def local_classifiers(template_classifier=None):
+    """Local classification stages tried before the LLM, most specific first."""
+    return [classifier for classifier in (get_page_classifier(), template_classifier) if classifier]
+
 
-def extract_templates( template_data, init_templates= True):
-    global template_classifier
+def extract_templates(template_data):
+    """Local first-stage classifier for the UI templates, or None when it is disabled or unavailable."""
     try:
         if template_data:
             _ , template_data = get_entities(template_data)
-            # if template_data:
-                # template_classifier = tfIDFTemplateClassifier(template_data, init_templates)
-            return True
+            return get_template_classifier(template_data.get("data", []))
     except Exception as error:
             logger.error(f"issue with the document {error}")
\ No newline at end of file
@@ -1,8 +1,23 @@
 from collections import defaultdict
 from utils.validation import Formatter
 from utils.log import logger
+from utils.executor import map_pages
+from utils.image_rotation import call_azure_ocr_IMAGE_Rotation
+from documents.OCR import call_azure_ocr_with_rotation, BLANK_PAGE_LINE
 from fuzzywuzzy import fuzz
+from PIL import ImageOps
+from dotenv import load_dotenv
 import json
+import os
+
+load_dotenv()
+
+# Page images are only needed for OCR; afterwards keep a small preview ("thumbnail"),
+# nothing ("none") or the full-resolution image ("full").
+PAGE_IMAGE_RETENTION = os.getenv("PAGE_IMAGE_RETENTION", "thumbnail").lower()
+PAGE_THUMBNAIL_SIZE = int(os.getenv("PAGE_THUMBNAIL_SIZE", 400))
+# Send each page's OCR text back with its result, so the backend can keep it for training.
+RETURN_OCR_TEXT = os.getenv("RETURN_OCR_TEXT", "true").lower() == "true"
 
 class Document:
     def __init__(self):
@@ -11,12 +26,62 @@ class Document:
     def __init__(self, filename=None, num_pages=None, doc_type=None):
         """Initialize the Document with filename, number of pages, and document type."""
         self.filename = filename
+        # Name of the uploaded file, for logs; `filename` holds the raw upload for the subclasses.
+        self.upload_name = None
         self.num_pages = num_pages
         self.doc_type = doc_type
         self.pagewise_classification = defaultdict(list)  
         self.pagewise_entities =  {}  
         self.pagewise_text = defaultdict(list)
         self.page_customer_type = {} 
+        # page_number -> "extract" or the reason extraction was skipped (see extraction_planner).
+        self.extraction_plan = {}
+        # The subset of those pages whose extraction request was actually saved.
+        self.skipped_extractions = {}
+
+    def process_pages(self, images):
+        """Rotate and OCR all pages on the shared page pool, keeping pages in document order."""
+        self.run_page_tasks(self.process_page, enumerate(images, start=1))
+
+    def run_page_tasks(self, func, items):
+        """Run func(*item) for every page item on the page pool, a few pages of this document at a time."""
+        # Insert the page keys up front so dict order follows the page order, not completion order.
+        for page_number in range(1, self.num_pages + 1):
+            self.pagewise_images[page_number]
+            self.pagewise_text[page_number]
+
+        for _ in map_pages(func, items):
+            pass
+
+    def process_page(self, page_number, image):
+        try:
+            corrected_image, ocr_text = call_azure_ocr_with_rotation(image)
+        except Exception as e:
+            logger.warning(f"Single-pass OCR failed for page {page_number}, using separate rotation and OCR calls: {e}")
+            try:
+                image = call_azure_ocr_IMAGE_Rotation(image)
+            except Exception as e:
+                logger.warning(f"Image rotation failed for page {page_number}: {e}")
+            self.add_image_to_page(page_number, image)
+            return
+
+        self.add_ocr_result_to_page(page_number, corrected_image, ocr_text)
+
+    def add_ocr_result_to_page(self, page_number, image, ocr_text):
+        """Store a page image together with OCR text that was already produced for it."""
+        if 1 <= page_number <= self.num_pages:
+            self.store_page_image(page_number, image)
+            self.pagewise_text[page_number].append(ocr_text)
+        else:
+            raise ValueError("Invalid page number.")
+
+    def store_page_image(self, page_number, image):
+        """Keep a page image according to PAGE_IMAGE_RETENTION once OCR no longer needs the pixels."""
+        if PAGE_IMAGE_RETENTION == "none" or image is None:
+            return
+        if PAGE_IMAGE_RETENTION == "thumbnail" and max(image.size) > PAGE_THUMBNAIL_SIZE:
+            image = ImageOps.contain(image, (PAGE_THUMBNAIL_SIZE, PAGE_THUMBNAIL_SIZE))
+        self.pagewise_images[page_number].append(image)
 
     def classify_page(self, page_number, classification, append= True):
         """Classify a specific page with the given classification."""
@@ -75,6 +140,52 @@ class Document:
                 else:
                     raise ValueError("Invalid page number.")
             return dict(self.pagewise_text)
+
+    def page_text(self, page_number):
+        """OCR text of a page as a string ("" when the page has none)."""
+        texts = self.pagewise_text.get(page_number, [])
+        if texts and isinstance(texts[0], dict):
+            return texts[0].get("text", "") or ""
+        return texts[0] if texts and isinstance(texts[0], str) else ""
+
+    def is_blank_page(self, page_number):
+        """True when OCR found no text on the page (azure_ocr writes BLANK_PAGE for empty pages)."""
+        return self.page_text(page_number).strip() in ("", BLANK_PAGE_LINE)
+
+    def add_skip_status(self, include_pages, page_numbers=None):
+        """Report pages the planner did not extract, with the reason, even when cleaning dropped them."""
+        if page_numbers is None:
+            page_numbers = self.extraction_plan.keys()
+        pages = {}
+        for page_number in sorted(include_pages.keys() | set(page_numbers)):
+            reason = self.extraction_plan.get(page_number, "extract")
+            if page_number in include_pages:
+                pages[page_number] = include_pages[page_number]
+                if reason != "extract" and isinstance(pages[page_number], dict):
+                    pages[page_number].setdefault("status", reason)
+            elif reason != "extract" and page_number in self.pagewise_classification:
+                pages[page_number] = {
+                    "classification": self.pagewise_classification[page_number].copy(),
+                    "status": reason,
+                    "extraction": [],
+                }
+        return pages
+
+    def add_ocr_text(self, include_pages):
+        if RETURN_OCR_TEXT:
+            for page_number, page_details in include_pages.items():
+                if isinstance(page_details, dict):
+                    page_details["ocr_text"] = self.page_text(page_number)
+        return include_pages
+
+    def page_result(self, page_number):
+        result = {}
+        if page_number in self.pagewise_classification:
+            result["classification"] = self.pagewise_classification[page_number].copy()
+        if page_number in self.pagewise_entities:
+            result["extraction"] = self.pagewise_entities[page_number].copy()
+        return result
+
     def get_page_details(self):
         results = defaultdict(dict)
         for page_number in self.pagewise_classification:
@@ -85,7 +196,14 @@ class Document:
         include_pages,excluded_pages= Formatter.cleaning_for_UI(results)
         logger.info(f"RAW RESULT:\n{json.dumps(results, indent=3)}")
         logger.info(f"EXCLUDE PAGES RESULT:\n{json.dumps(excluded_pages, indent=3)}")
-        return include_pages 
+        return self.add_ocr_text(self.add_skip_status(include_pages))
+
+    def get_single_page_details(self, page_number):
+        """Cleaned result of one finished page, or None when the page is dropped for the UI."""
+        include_pages, excluded_pages = Formatter.cleaning_for_UI({page_number: self.page_result(page_number)})
+        if excluded_pages:
+            logger.info(f"EXCLUDE PAGES RESULT:\n{json.dumps(excluded_pages, indent=3)}")
+        return self.add_ocr_text(self.add_skip_status(include_pages, [page_number])).get(page_number)
 
     def get_page_entities(self):
         
@@ -94,61 +212,69 @@ class Document:
 
     def unify_classification(self, templates):
         for page_number in range(1, self.num_pages + 1):
-            classes = self.pagewise_classification[page_number]
-            if len(classes) == 1:
-                self.pagewise_classification[page_number] = classes[0].copy()
+            self.unify_page_classification(page_number)
 
-                logger.info(f"Classification:: STEP 4: Only one class found from openai, result returned -- {classes[0].copy()}")
-            elif len(classes) > 1:
-                if classes[0]['class_name'] == classes[1]['class_name']:
-                    self.pagewise_classification[page_number] = classes[0].copy()
-                    logger.info(f"Classification:: STEP 4: Overall classes, result returned -- {classes[0].copy()}")
-                else:
-                    classes[0].update({
-                        "score": 0.5,
-                        "manual_check": True,
-                        "other_prediction": classes[1].copy()
-                    })
-                    self.pagewise_classification[page_number] = classes[0].copy()
-                    logger.info(f"Classification:: STEP 4: Conflicting classes, result returned -- {classes[0].copy()}")
+    def unify_page_classification(self, page_number):
+        classes = self.pagewise_classification[page_number]
+        if len(classes) == 1:
+            self.pagewise_classification[page_number] = classes[0].copy()
+
+            logger.info(f"Classification:: STEP 4: Only one class found from openai, result returned -- {classes[0].copy()}")
+        elif len(classes) > 1:
+            if classes[0]['class_name'] == classes[1]['class_name']:
+                self.pagewise_classification[page_number] = classes[0].copy()
+                logger.info(f"Classification:: STEP 4: Overall classes, result returned -- {classes[0].copy()}")
+            else:
+                classes[0].update({
+                    "score": 0.5,
+                    "manual_check": True,
+                    "other_prediction": classes[1].copy()
+                })
+                self.pagewise_classification[page_number] = classes[0].copy()
+                logger.info(f"Classification:: STEP 4: Conflicting classes, result returned -- {classes[0].copy()}")
 
     def unify_extraction(self):
         considered_entities = []
-        threshold=70
         for page_number in range(1, self.num_pages+1):
-            entities =  self.pagewise_entities[page_number]
+            self.unify_page_extraction(page_number, considered_entities)
 
-            aimodel_data = entities[0] if len(entities) > 0 else []
-            numind_data = entities[1] if len(entities) > 1 else None
+    def unify_page_extraction(self, page_number, considered_entities=None):
+        if considered_entities is None:
+            considered_entities = []
+        threshold=70
+        entities =  self.pagewise_entities[page_number]
 
-            if numind_data is None:
-                for aimodel_v in aimodel_data:
-                    aimodel_v['checked'] = False
-                self.pagewise_entities[page_number] = aimodel_data.copy()
-                continue
+        aimodel_data = entities[0] if len(entities) > 0 else []
+        numind_data = entities[1] if len(entities) > 1 else None
 
+        if numind_data is None:
             for aimodel_v in aimodel_data:
-                matched = False
                 aimodel_v['checked'] = False
+            self.pagewise_entities[page_number] = aimodel_data.copy()
+            return
+
+        for aimodel_v in aimodel_data:
+            matched = False
+            aimodel_v['checked'] = False
 
-                for numin_v in numind_data:
-                    if aimodel_v['entity_name'] == numin_v['entity_name']:
-                        matched = True
-                        considered_entities.append(aimodel_v['entity_name'])
-                        similarity_score = fuzz.ratio(
-                            str(aimodel_v['entity_value']).lower(), 
-                            str(numin_v['entity_value']).lower()
-                        )
-                        if similarity_score >= threshold:
-                            aimodel_v['checked'] = True
-            
             for numin_v in numind_data:
-                if numin_v['entity_name'] not in considered_entities:
-                    considered_entities.append(numin_v['entity_name'])
-                    numin_v['checked'] = False
-                    numin_v['model'] = 'nu-mind'
-                    aimodel_data.append(numin_v)
-            self.pagewise_entities[page_number] = aimodel_data.copy()
+                if aimodel_v['entity_name'] == numin_v['entity_name']:
+                    matched = True
+                    considered_entities.append(aimodel_v['entity_name'])
+                    similarity_score = fuzz.ratio(
+                        str(aimodel_v['entity_value']).lower(), 
+                        str(numin_v['entity_value']).lower()
+                    )
+                    if similarity_score >= threshold:
+                        aimodel_v['checked'] = True
+        
+        for numin_v in numind_data:
+            if numin_v['entity_name'] not in considered_entities:
+                considered_entities.append(numin_v['entity_name'])
+                numin_v['checked'] = False
+                numin_v['model'] = 'nu-mind'
+                aimodel_data.append(numin_v)
+        self.pagewise_entities[page_number] = aimodel_data.copy()
 
     def __str__(self):
         """Return a string representation of the document."""
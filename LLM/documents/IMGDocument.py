@@ -5,7 +5,6 @@ from documents.OCR import call_azure_ocr
 from io import BytesIO
 from utils.log import logger
 from collections import defaultdict
-from utils.image_rotation import call_azure_ocr_IMAGE_Rotation
 import numpy as np
 
 class IMGDocument(Document):
@@ -19,12 +18,7 @@ class IMGDocument(Document):
             self.pagewise_images = defaultdict(list)
             self.pagewise_text = defaultdict(list)
 
-            try:
-                img = call_azure_ocr_IMAGE_Rotation(img)
-            except Exception as e:
-                logger.warning(f"Image rotation failed: {e}")
-
-            self.add_image_to_page(1, img)
+            self.process_pages([img])
 
         except Exception as e:
             raise RuntimeError(f"Error initializing IMGDocument: {e}")
@@ -81,7 +75,7 @@ class IMGDocument(Document):
     def add_image_to_page(self, page_number, image):
         """Add an image to a specific page."""
         if 1 <= page_number <= self.num_pages:
-            self.pagewise_images[page_number].append(image.copy())
+            self.store_page_image(page_number, image)
             self.perform_ocr(page_number, image, True)
         else:
             raise ValueError("Invalid page number.")
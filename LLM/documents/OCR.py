@@ -4,86 +4,136 @@ import cv2
 from io import BytesIO
 from PIL import Image
 from utils.log import logger
-from azure.cognitiveservices.vision.computervision import ComputerVisionClient
 from azure.cognitiveservices.vision.computervision.models import OperationStatusCodes
-from msrest.authentication import CognitiveServicesCredentials
 import os
-import pandas as pd
 import time
 from deskew import determine_skew
+from utils.image_rotation import correct_orientation, orientation_matrix
+from utils.azure_read import prepare_for_upload, read_image
+from utils import ocr_cache
+from documents.layout import lines_to_text, words_to_text
 from dotenv import load_dotenv
 load_dotenv()
 
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
-ocrEndpoint =  os.getenv("ocrEndpoint")
-subscriptionKey = os.getenv("subscriptionKey")
 
+# "words" rebuilds rows from word boxes with " | " between columns; "lines" keeps the
+# original space-padded line layout.
+OCR_LAYOUT_ENGINE = os.getenv("OCR_LAYOUT_ENGINE", "words").lower()
+# Both in multiples of the median word height on the page.
+OCR_ROW_TOLERANCE = float(os.getenv("OCR_ROW_TOLERANCE", 0.5))
+OCR_COLUMN_GAP = float(os.getenv("OCR_COLUMN_GAP", 3.0))
 
-computervision_client = ComputerVisionClient(ocrEndpoint, CognitiveServicesCredentials(subscriptionKey))
+# Read coordinates are mapped to a page this many pixels wide, whatever resolution was uploaded.
+REFERENCE_WIDTH = 2000
 
-import cv2, imutils, time, os, shutil
+BLANK_PAGE_LINE = 'BLANK_PAGE'
+BLANK_PAGE_WORD = 'BLANK_WORD0099'
+
+import cv2, imutils, time, os
 import numpy as np
 
 
 
 def call_azure_ocr(IMAGE_PATH):
+    cache_key = ocr_cache.image_key("ocr", IMAGE_PATH)
+    cached = ocr_cache.get(cache_key)
+    if cached is not None:
+        return post_processing(cached)
+
     img = IMAGE_PATH.convert("RGBA")
-    data = IMAGE_PATH.getdata()
-    extracted_text = azure_ocr(img)
-    extracted_text = post_processing(extracted_text)
+    ocr_data = azure_ocr(img)
+    extracted_text = post_processing(ocr_data)
     # logger.info(f"extracted_text Line 35 :: {extracted_text}")
+    ocr_cache.put(cache_key, ocr_data)
     return extracted_text
 
 
-def recreate_folder(path):
-    if os.path.exists(path) and os.path.isdir(path):
-        # os.rmdir(path)  # This removes the folder if it is empty
-        shutil.rmtree(path)
-    elif os.path.exists(path):
-        return
+def call_azure_ocr_with_rotation(image):
+    """Single Read call per page: returns the orientation-corrected image and its post-processed text.
+
+    The angle reported by the Read API is used to rotate the page, and the lines/words of the
+    same response are mapped into the rotated frame instead of uploading the page a second time.
+    """
+    cache_key = ocr_cache.image_key("page", image)
+    cached = ocr_cache.get(cache_key)
+
+    image = cv2.cvtColor(np.array(image.convert("RGBA")), cv2.COLOR_RGBA2BGR)
+    if cached is not None:
+        corrected_image = correct_orientation(image, cached["angle"])
+        return Image.fromarray(cv2.cvtColor(corrected_image, cv2.COLOR_BGR2RGB)), post_processing(cached)
+
+    upload = prepare_for_upload(image)
+
+    read_result = read_image(upload)
+    if read_result.status != OperationStatusCodes.succeeded:
+        raise RuntimeError(f"Azure Read failed with status {read_result.status}")
+
+    read_results = read_result.analyze_result.read_results
+    angle = read_results[0].angle if read_results and read_results[0].angle else 0
+
+    corrected_image = correct_orientation(image, angle)
+    ocr_data = collect_read_result(read_result, reference_matrix(upload.shape, image.shape, angle))
+    extracted_text = post_processing(ocr_data)
+    ocr_cache.put(cache_key, {**ocr_data, "angle": angle})
+
+    return Image.fromarray(cv2.cvtColor(corrected_image, cv2.COLOR_BGR2RGB)), extracted_text
 
-    os.mkdir(path)
 
 def azure_ocr(image):
-    image = imutils.resize(np.array(image), width=2000)
-    
-    recreate_folder("images")
+    image = cv2.cvtColor(np.array(image.convert("RGB")), cv2.COLOR_RGB2BGR)
+    upload = prepare_for_upload(image)
+    read_result = read_image(upload)
+    if read_result.status == OperationStatusCodes.succeeded:
+        return collect_read_result(read_result, reference_matrix(upload.shape, image.shape))
 
-    cv2.imwrite("images/buffer.jpg", image)
-    computervision_client = ComputerVisionClient(ocrEndpoint, CognitiveServicesCredentials(subscriptionKey))
 
-    with open('images/buffer.jpg', 'rb') as image_stream:
-        read_response = computervision_client.read_in_stream(image_stream, raw=True)
+def reference_shape(shape):
+    """Shape of a page scaled to REFERENCE_WIDTH, the frame the layout thresholds are tuned for."""
+    (h, w) = shape[:2]
+    return (int(h * REFERENCE_WIDTH / float(w)), REFERENCE_WIDTH)
 
-    read_operation_location = read_response.headers["Operation-Location"]
-    operation_id = read_operation_location.split("/")[-1]
 
-    while True:
-        read_result = computervision_client.get_read_result(operation_id)
-        if read_result.status not in ['notStarted', 'running']:
-            break
-        time.sleep(1)
+def reference_matrix(upload_shape, shape, angle=0):
+    """Affine map from uploaded-image pixels to the orientation-corrected reference frame of the page."""
+    (ref_h, ref_w) = reference_shape(shape)
+    scale = np.array([[ref_w / upload_shape[1], 0.0], [0.0, ref_h / upload_shape[0]]])
+    if angle:
+        rotation = orientation_matrix((ref_h, ref_w), angle)
+        return np.hstack([rotation[:, :2] @ scale, rotation[:, 2:]])
+    return np.hstack([scale, np.zeros((2, 1))])
 
+
+def transform_bbox(bbox, matrix):
+    """Apply a 2x3 affine matrix to a flat [x1, y1, ..., x4, y4] bounding box."""
+    if matrix is None:
+        return bbox
+    points = np.array(bbox, dtype=float).reshape(-1, 2)
+    points = points @ matrix[:, :2].T + matrix[:, 2]
+    return points.reshape(-1).tolist()
+
+
+def collect_read_result(read_result, matrix=None):
+    """Flatten a succeeded Read result into lines and words, optionally mapped through `matrix`."""
     value = []
     words = []
     line_number = 0
-    if read_result.status == OperationStatusCodes.succeeded:
-        for text_result in read_result.analyze_result.read_results:
-            for line in text_result.lines:
-                line_number += 1
-                value.append({'line':line.text, 'bbox':  line.bounding_box})
-                for word in line.words:
-                    words.append({'word':word.text, 'bbox':  word.bounding_box, 'line_number': line_number})
+    for text_result in read_result.analyze_result.read_results:
+        for line in text_result.lines:
+            line_number += 1
+            value.append({'line':line.text, 'bbox':  transform_bbox(line.bounding_box, matrix)})
+            for word in line.words:
+                words.append({'word':word.text, 'bbox':  transform_bbox(word.bounding_box, matrix), 'line_number': line_number})
 
-        #Handle Blank Page
-        if not value and not words:  # No text detected
-            sample_bbox =[0, 0, 100, 0, 100, 100, 0, 100]
-            value.append({'line': 'BLANK_PAGE', 'bbox': sample_bbox})  
-            words.append({'word': 'BLANK_WORD0099', 'bbox': sample_bbox, 'line_number': 1}) 
-            logger.info(f"This Page is BLANK PAGE.")
+    #Handle Blank Page
+    if not value and not words:  # No text detected
+        sample_bbox =[0, 0, 100, 0, 100, 100, 0, 100]
+        value.append({'line': BLANK_PAGE_LINE, 'bbox': sample_bbox})  
+        words.append({'word': BLANK_PAGE_WORD, 'bbox': sample_bbox, 'line_number': 1}) 
+        logger.info(f"This Page is BLANK PAGE.")
 
 
-        return {'line': value, 'words':words}
+    return {'line': value, 'words':words}
 
 
 def get_corrdinate(x):
@@ -107,83 +157,9 @@ def Average(lst):
     return(avg)
 
 
-def get_threshold(words):
-    data = pd.DataFrame(words)
-    x_ = data.groupby(by='line_number')
-    overall_space_diff = []
-    for _, each in list(x_):
-        for i in range(1, each.shape[0]):
-            prev_word_end = each.iloc[i-1]['bbox'][2]
-
-            curr_word_start = each.iloc[i]['bbox'][0]
-
-            # Calculate space difference between current word and previous word
-            space_diff = abs(curr_word_start - prev_word_end)
-            overall_space_diff.append(space_diff)
-    # return Average(overall_space_diff)
-    return 15
-
-
 def post_processing(data):
-    line_info = data['line']
+    """Page text for the prompts, laid out by the configured OCR_LAYOUT_ENGINE."""
     words = data['words']
-    space_difference_threshold = get_threshold(words)
-    data = pd.DataFrame(line_info)
-    data['mean'] =  data['bbox'].apply(lambda x: get_corrdinate(x)  )
-    data['line_number'] = -1
-    base = 0
-    line = 0
-    min_x = 1000
-    variations = 20
-    considered_index = []
-    for index, row in data.iterrows():
-        x_coordinates = row['bbox']
-        x_coordinates = x_coordinates[::2]
-        min_x = min(min(x_coordinates), min_x)
-        if index in considered_index:
-                continue
-        line = line + 1
-        data.at[index, 'line_number'] = line
-        y = row['mean'][1]
-        for index2, row2 in data.iterrows():
-            if index2 in considered_index:
-                continue
-            if index >= index2:
-                continue
-            y2 = row2['mean'][1]
-            if abs(y - y2) < variations:
-                # print('here')
-                # print(row)
-                considered_index.append(index2)
-                data.at[index2, 'line_number'] = line
-    data['x'] = data['mean'].apply(lambda x: x[0])
-    data=data.sort_values(by = ['line_number', 'x'], ascending = [True, True], na_position = 'first')
-    x_ = data.groupby(by='line_number')
-    text = ''
-    # space_difference_threshold = 20  #
-    for index, each in list(x_):
-        temp_text = ''
-        for i in range(0, each.shape[0]):
-            if i ==0:
-                prev_word_end = min_x
-            else:
-                prev_word_end = each.iloc[i-1]['bbox'][2]
-
-            curr_word_start = each.iloc[i]['bbox'][0]
-
-            # Calculate space difference between current word and previous word
-            space_diff = curr_word_start - prev_word_end
-
-            # If the space difference is large, add more space (this threshold can be adjusted)
-            if space_diff > space_difference_threshold:
-                # temp_text += '|'  # Add spaces proportional to the difference
-                temp_text += ' ' * int(space_diff / space_difference_threshold)  # Add spaces proportional to the difference
-            temp_text += each.iloc[i]['line']
-
-        text = text + temp_text + "\n"
-
-    # file1 = open("___text.txt","w",encoding="utf-8")
-    # file1.write(text)
-    # file1.close()
-    return text
-
+    if OCR_LAYOUT_ENGINE == "words" and words and words[0]['word'] != BLANK_PAGE_WORD:
+        return words_to_text(words, row_tolerance=OCR_ROW_TOLERANCE, column_gap=OCR_COLUMN_GAP)
+    return lines_to_text(data['line'], variations=20, space_threshold=15)
@@ -1,30 +1,66 @@
 from documents.Document import Document
-from pdf2image import convert_from_bytes
-from documents.OCR import call_azure_ocr
+from pdf2image import convert_from_path, pdfinfo_from_path
+from documents.OCR import call_azure_ocr, post_processing
+from documents.pdf_text import read_text_layer
+from utils import metrics
 from utils.log import logger
 from collections import defaultdict
-from utils.image_rotation import call_azure_ocr_IMAGE_Rotation
+from dotenv import load_dotenv
 import numpy as np
+import os
+import tempfile
+
+load_dotenv()
+
+# Pages are rendered one at a time inside the page tasks, so at most OCR_PAGE_CONCURRENCY
+# rendered pages of a document are held in memory. The Read upload is scaled to 2000 px wide,
+# which 200 DPI already covers for A4/Letter pages.
+PDF_DPI = int(os.getenv("PDF_DPI", 200))
+PDF_RENDER_TIMEOUT = int(os.getenv("PDF_RENDER_TIMEOUT", 120))
 
 class PDFDocument(Document):
     def __init__(self, filename):
-        """Initialize the PDFDocument, extract images, and store pagewise data."""
+        """Initialize the PDFDocument, render and OCR its pages, and store pagewise data."""
         try:
-            images = convert_from_bytes(filename)
-            self.num_pages = len(images)
-            super().__init__(filename, self.num_pages, "PDF")
-            self.pagewise_images =defaultdict(list)
-            self.pagewise_text = defaultdict(list)
-            for page_number, image in enumerate(images, start=1):
-                try:
-                    image = call_azure_ocr_IMAGE_Rotation(image)
-                    self.add_image_to_page(page_number, image)
-                except Exception as e:
-                    self.add_image_to_page(page_number, image)
+            # poppler reads from a file; write the upload once instead of once per rendered page.
+            with tempfile.TemporaryDirectory(prefix="pdf-") as folder:
+                self.pdf_path = os.path.join(folder, "document.pdf")
+                with open(self.pdf_path, "wb") as pdf_file:
+                    pdf_file.write(filename)
+
+                self.num_pages = pdfinfo_from_path(self.pdf_path, timeout=PDF_RENDER_TIMEOUT)["Pages"]
+                super().__init__(filename, self.num_pages, "PDF")
+                self.pagewise_images =defaultdict(list)
+                self.pagewise_text = defaultdict(list)
+                self.text_layer_pages = read_text_layer(self.pdf_path)
+                logger.info(f"PDF text layer used for {len(self.text_layer_pages)} of {self.num_pages} pages")
+                self.run_page_tasks(self.render_and_process_page, ((page_number,) for page_number in range(1, self.num_pages + 1)))
 
         except Exception as e:
             raise RuntimeError(f"Error initializing PDFDocument and extracting images: {e}")
 
+    def render_page(self, page_number):
+        """Rasterize a single page of the PDF at PDF_DPI."""
+        images = convert_from_path(
+            self.pdf_path,
+            dpi=PDF_DPI,
+            first_page=page_number,
+            last_page=page_number,
+            timeout=PDF_RENDER_TIMEOUT,
+        )
+        if not images:
+            raise RuntimeError(f"Page {page_number} could not be rendered")
+        return images[0]
+
+    def render_and_process_page(self, page_number):
+        page_data = self.text_layer_pages.pop(page_number, None)
+        if page_data is not None:
+            self.pagewise_text[page_number].append(post_processing(page_data))
+            metrics.increment("pdf.pages.text_layer")
+            return
+        metrics.increment("pdf.pages.ocr")
+        self.process_page(page_number, self.render_page(page_number))
+
     def perform_ocr(self, page_number, image, do_ocr = False):
         try:
             if do_ocr:
@@ -67,7 +103,7 @@ class PDFDocument(Document):
     def add_image_to_page(self, page_number, image):
         """Add an image to a specific page."""
         if 1 <= page_number <= self.num_pages:
-            self.pagewise_images[page_number].append(image)
+            self.store_page_image(page_number, image)
             self.perform_ocr(page_number, image, True)
         else:
             raise ValueError("Invalid page number.")
@@ -5,7 +5,6 @@ from documents.OCR import call_azure_ocr
 from io import BytesIO
 from utils.log import logger
 from collections import defaultdict
-from utils.image_rotation import call_azure_ocr_IMAGE_Rotation
 import numpy as np
 import io
 
@@ -28,31 +27,40 @@ class TIFFDocument(Document):
                 raise RuntimeError(f"Error opening TIFF file: {e}")
 
 
-            images = []
-            try:
-                while True:
-                    images.append(img.convert("RGB"))
-                    img.seek(img.tell() + 1)  # Move to next frame
-            except Exception as e:
-                logger.info(f"All tiff pages collect.  Stopping. Reason: {e}")
-
-            super().__init__(filename, len(images) , "TIFF")
+            super().__init__(filename, getattr(img, "n_frames", 1), "TIFF")
             self.pagewise_images = defaultdict(list)  # Dictionary to store images for each page in PIL.Image format
             self.pagewise_text = defaultdict(list)
-            
-            # Iterate over all the pages in the TIFF document
-            for page_number, image in enumerate(images):
-                image = image.copy()
-                try:
-                    image = call_azure_ocr_IMAGE_Rotation(image)
-                    self.add_image_to_page(page_number + 1, image)  # Store images with 1-based indexing
-                except Exception as e:
-                    
-                    self.add_image_to_page(page_number + 1, image)  # Store images with 1-based indexing
+
+            # Rotate and OCR all the pages in the TIFF document, 1-based. Frames are decoded
+            # only when the page pool has room for them.
+            self.decoded_frames = 0
+            self.process_pages(self.iter_frames(img))
+            self.drop_undecoded_pages()
 
         except Exception as e:
             raise RuntimeError(f"Error initializing TIFFDocument and extracting images: {e}")
 
+    def iter_frames(self, img):
+        """Decode the TIFF frames one at a time as RGB images, stopping at the first unreadable frame."""
+        for frame in range(self.num_pages):
+            try:
+                img.seek(frame)
+                image = img.convert("RGB")
+            except Exception as e:
+                logger.warning(f"TIFF declares {self.num_pages} frames but frame {frame + 1} could not be read: {e}")
+                return
+            self.decoded_frames += 1
+            yield image
+
+    def drop_undecoded_pages(self):
+        """Count only the frames that decoded, so unreadable ones are never classified or extracted."""
+        if self.decoded_frames >= self.num_pages:
+            return
+        for page_number in range(self.decoded_frames + 1, self.num_pages + 1):
+            self.pagewise_images.pop(page_number, None)
+            self.pagewise_text.pop(page_number, None)
+        self.num_pages = self.decoded_frames
+
     def perform_ocr(self, page_number, image, do_ocr=False):
         try:
             if do_ocr:
@@ -102,7 +110,7 @@ class TIFFDocument(Document):
     def add_image_to_page(self, page_number, image):
         """Add an image to a specific page."""
         if 1 <= page_number <= self.num_pages:
-            self.pagewise_images[page_number].append(image.copy())
+            self.store_page_image(page_number, image)
             self.perform_ocr(page_number, image, True)
         else:
             raise ValueError("Invalid page number.")
@@ -0,0 +1,129 @@
+import numpy as np
+
+
+def line_centres(bboxes):
+    """Centre (x, y) of each flat [x1, y1, ..., x4, y4] bounding box."""
+    # Summed left to right like the original per-row sum() so results match bit for bit.
+    x = (((bboxes[:, 0] + bboxes[:, 2]) + bboxes[:, 4]) + bboxes[:, 6]) / 4
+    y = (((bboxes[:, 1] + bboxes[:, 3]) + bboxes[:, 5]) + bboxes[:, 7]) / 4
+    return x, y
+
+
+def group_rows(centre_y, variations):
+    """Assign a visual row number to every line.
+
+    Lines are visited in OCR order; the first unassigned line opens a new row and every later
+    unassigned line whose centre is within `variations` pixels of it joins that row. Candidates
+    are found with a sort-and-sweep window over the y-sorted centres instead of a full scan.
+    """
+    count = len(centre_y)
+    order = np.argsort(centre_y, kind="stable")
+    sorted_y = centre_y[order]
+    row_numbers = np.full(count, -1, dtype=np.int64)
+    # Slightly wider window than the test below so float rounding never drops a candidate.
+    reach = variations + 1e-6 * max(1.0, variations)
+
+    row = 0
+    for index in range(count):
+        if row_numbers[index] != -1:
+            continue
+        row += 1
+        row_numbers[index] = row
+
+        y = centre_y[index]
+        low = np.searchsorted(sorted_y, y - reach, side="left")
+        high = np.searchsorted(sorted_y, y + reach, side="right")
+        window = order[low:high]
+        members = window[
+            (window > index)
+            & (row_numbers[window] == -1)
+            & (np.abs(centre_y[window] - y) < variations)
+        ]
+        row_numbers[members] = row
+    return row_numbers
+
+
+def lines_to_text(lines, variations=20, space_threshold=15, min_x=1000):
+    """Rebuild page text from Azure lines: group them into rows, order each row by x and pad
+    horizontal gaps with one space per `space_threshold` pixels."""
+    if not lines:
+        return ""
+
+    bboxes = np.array([line["bbox"] for line in lines], dtype=float)
+    texts = [line["line"] for line in lines]
+
+    centre_x, centre_y = line_centres(bboxes)
+    row_numbers = group_rows(centre_y, variations)
+    min_x = min(min_x, bboxes[:, 0::2].min())
+
+    order = np.lexsort((centre_x, row_numbers))
+    sorted_rows = row_numbers[order]
+    row_start = np.empty(len(order), dtype=bool)
+    row_start[0] = True
+    row_start[1:] = sorted_rows[1:] != sorted_rows[:-1]
+
+    previous_end = np.empty(len(order))
+    previous_end[1:] = bboxes[order[:-1], 2]
+    previous_end[row_start] = min_x
+    gaps = bboxes[order, 0] - previous_end
+    padding = np.zeros(len(order), dtype=np.int64)
+    wide = gaps > space_threshold
+    padding[wide] = (gaps[wide] / space_threshold).astype(np.int64)
+
+    parts = []
+    for position, line_index in enumerate(order.tolist()):
+        if position and row_start[position]:
+            parts.append("\n")
+        parts.append(" " * int(padding[position]))
+        parts.append(texts[line_index])
+    parts.append("\n")
+    return "".join(parts)
+
+
+def word_extents(bboxes):
+    """Axis-aligned left, right, top and bottom of each flat bounding box."""
+    xs = bboxes[:, 0::2]
+    ys = bboxes[:, 1::2]
+    return xs.min(axis=1), xs.max(axis=1), ys.min(axis=1), ys.max(axis=1)
+
+
+def words_to_text(words, row_tolerance=0.5, column_gap=3.0, separator=" | "):
+    """Rebuild page text from Azure words in reading order.
+
+    Words whose vertical centres follow each other within `row_tolerance` median word heights
+    share a row, and rows are read left to right with single spaces. A horizontal gap wider
+    than `column_gap` median word heights between words of different Azure lines is a column
+    boundary and gets `separator` instead of a run of padding spaces.
+    """
+    if not words:
+        return ""
+
+    bboxes = np.array([word["bbox"] for word in words], dtype=float)
+    texts = [word["word"] for word in words]
+    line_numbers = np.array([word.get("line_number", 0) for word in words])
+
+    left, right, top, bottom = word_extents(bboxes)
+    unit = float(np.median(np.maximum(bottom - top, 1.0)))
+    centre_y = (top + bottom) / 2
+
+    by_height = np.argsort(centre_y, kind="stable")
+    row_breaks = np.diff(centre_y[by_height]) > row_tolerance * unit
+    row_numbers = np.empty(len(words), dtype=np.int64)
+    row_numbers[by_height] = np.concatenate(([0], np.cumsum(row_breaks)))
+
+    order = np.lexsort((left, row_numbers))
+    new_row = row_numbers[order][1:] != row_numbers[order][:-1]
+    gaps = left[order][1:] - right[order][:-1]
+    new_column = (line_numbers[order][1:] != line_numbers[order][:-1]) & (gaps > column_gap * unit)
+
+    parts = [texts[order[0]]]
+    for position, word_index in enumerate(order[1:].tolist()):
+        if new_row[position]:
+            parts.append("\n")
+        elif new_column[position]:
+            parts.append(separator)
+        else:
+            parts.append(" ")
+        parts.append(texts[word_index])
+    parts.append("\n")
+    return "".join(parts)
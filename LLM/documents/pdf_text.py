@@ -0,0 +1,142 @@
+import os
+import subprocess
+import xml.etree.ElementTree as ET
+from dotenv import load_dotenv
+from utils.log import logger
+
+load_dotenv()
+
+# Born-digital PDFs carry a text layer with word positions; pages where it looks complete are
+# laid out from it directly instead of being rasterized and sent to Azure Read.
+PDF_TEXT_LAYER = os.getenv("PDF_TEXT_LAYER", "true").lower() == "true"
+PDF_TEXT_MIN_WORDS = int(os.getenv("PDF_TEXT_MIN_WORDS", 10))
+PDF_TEXT_MIN_PRINTABLE = float(os.getenv("PDF_TEXT_MIN_PRINTABLE", 0.9))
+PDF_TEXT_TIMEOUT = int(os.getenv("PDF_TEXT_TIMEOUT", 60))
+# Pages whose embedded images cover more than this share of the page are OCRed anyway: the text
+# layer may be a printed caption around a scan (e.g. an ID copy) whose text only OCR can read.
+PDF_TEXT_MAX_IMAGE_AREA = float(os.getenv("PDF_TEXT_MAX_IMAGE_AREA", 0.05))
+
+# Same reference frame as the OCR path, where pages are uploaded 2000 px wide.
+PAGE_WIDTH = 2000
+
+
+def run_pdftotext(pdf_path):
+    """XHTML with page, line and word boxes from poppler's pdftotext, or None if unavailable."""
+    try:
+        completed = subprocess.run(
+            ["pdftotext", "-bbox-layout", "-enc", "UTF-8", pdf_path, "-"],
+            capture_output=True,
+            timeout=PDF_TEXT_TIMEOUT,
+        )
+    except (OSError, subprocess.TimeoutExpired) as error:
+        logger.warning(f"pdftotext could not read the text layer: {error}")
+        return None
+    if completed.returncode != 0:
+        logger.warning(f"pdftotext failed with code {completed.returncode}: {completed.stderr[:200]!r}")
+        return None
+    return completed.stdout
+
+
+def run_pdfimages(pdf_path):
+    """{page_number: [(width_in, height_in), ...]} of the images drawn on each page, or None if unavailable."""
+    try:
+        completed = subprocess.run(
+            ["pdfimages", "-list", pdf_path],
+            capture_output=True,
+            text=True,
+            timeout=PDF_TEXT_TIMEOUT,
+        )
+    except (OSError, subprocess.TimeoutExpired) as error:
+        logger.warning(f"pdfimages could not list the embedded images: {error}")
+        return None
+    if completed.returncode != 0:
+        logger.warning(f"pdfimages failed with code {completed.returncode}: {completed.stderr[:200]!r}")
+        return None
+
+    images = {}
+    # page num type width height color comp bpc enc interp object ID x-ppi y-ppi size ratio
+    for row in completed.stdout.splitlines()[2:]:
+        fields = row.split()
+        if len(fields) < 14 or fields[2] != "image":
+            continue
+        try:
+            page_number, width, height = int(fields[0]), int(fields[3]), int(fields[4])
+            x_ppi, y_ppi = float(fields[12]), float(fields[13])
+        except ValueError:
+            continue
+        if x_ppi <= 0 or y_ppi <= 0:
+            # Unknown placement: treat the image as covering the page.
+            x_ppi = y_ppi = 1e-6
+        images.setdefault(page_number, []).append((width / x_ppi, height / y_ppi))
+    return images
+
+
+def image_area_ratio(page, page_images):
+    """Share of the page area covered by its embedded images (pdftotext sizes are in points)."""
+    page_area = float(page.get("width")) / 72 * float(page.get("height")) / 72
+    if page_area <= 0:
+        return 1.0
+    return sum(width * height for width, height in page_images) / page_area
+
+
+def box(element, scale):
+    """Flat [x1, y1, ..., x4, y4] box of an element's xMin/yMin/xMax/yMax, scaled to the page frame."""
+    x_min, y_min, x_max, y_max = (float(element.get(name)) * scale for name in ("xMin", "yMin", "xMax", "yMax"))
+    return [x_min, y_min, x_max, y_min, x_max, y_max, x_min, y_max]
+
+
+def parse_page(page):
+    """Lines and words of one <page> element in the same shape as OCR.collect_read_result."""
+    scale = PAGE_WIDTH / float(page.get("width"))
+    lines = []
+    words = []
+    for line in page.iterfind(".//{*}line"):
+        line_words = [word for word in line.iterfind(".//{*}word") if (word.text or "").strip()]
+        if not line_words:
+            continue
+        line_number = len(lines) + 1
+        for word in line_words:
+            words.append({'word': word.text.strip(), 'bbox': box(word, scale), 'line_number': line_number})
+        lines.append({'line': " ".join(word.text.strip() for word in line_words), 'bbox': box(line, scale)})
+    return {'line': lines, 'words': words}
+
+
+def is_usable(page_data):
+    """A text layer is trusted when it has enough words and is not mostly unmapped glyphs."""
+    words = page_data['words']
+    if not words or len(words) < PDF_TEXT_MIN_WORDS:
+        return False
+    text = "".join(word['word'] for word in words)
+    printable = sum(1 for char in text if char.isprintable() and char != "�")
+    return printable / len(text) >= PDF_TEXT_MIN_PRINTABLE
+
+
+def read_text_layer(pdf_path):
+    """{page_number: {'line': [...], 'words': [...]}} for the pages whose text layer can replace OCR.
+
+    A page qualifies when its text layer looks complete and it carries no sizeable embedded image.
+    """
+    if not PDF_TEXT_LAYER:
+        return {}
+    output = run_pdftotext(pdf_path)
+    if not output:
+        return {}
+    try:
+        root = ET.fromstring(output)
+    except ET.ParseError as error:
+        logger.warning(f"Could not parse the pdftotext output: {error}")
+        return {}
+
+    images = run_pdfimages(pdf_path)
+    if images is None:
+        # Without the image list a page with an embedded scan cannot be told apart; OCR everything.
+        return {}
+
+    pages = {}
+    for page_number, page in enumerate(root.iterfind(".//{*}page"), start=1):
+        if image_area_ratio(page, images.get(page_number, [])) > PDF_TEXT_MAX_IMAGE_AREA:
+            continue
+        page_data = parse_page(page)
+        if is_usable(page_data):
+            pages[page_number] = page_data
+    return pages
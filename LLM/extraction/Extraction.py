@@ -87,6 +87,10 @@ class Extraction:
                 logger.warning("JSON could not be fixed. Returning empty dictionary.")
                 return {}
 
+        return self.flatten_entities(cleaned_dict)
+
+    def flatten_entities(self, cleaned_dict):
+        """Flatten a parsed model answer into {entity_name: value}."""
         flat_dict = {}
 
         def flatten(d, parent_key=""):
@@ -121,8 +125,10 @@ class Extraction:
                 best_score = score
         return best_match, best_score
     
-    def match_actual_entities(self, entities,customer_type):
+    def match_actual_entities(self, entities,customer_type, template_entities=None):
         results = []
+        if template_entities is None:
+            template_entities = self.template_entities
         logger.info("Starting match_actual_entities")
 
         if not entities:
@@ -137,7 +143,7 @@ class Extraction:
             elif isinstance(section_data, str):
                 flattened_entities[section.lower()] = section_data
 
-        for entity in self.template_entities:
+        for entity in template_entities:
             entity_customer_type = entity.get('entity_key_customer_type', '').strip().lower()
             entity_name = entity.get('entity_name', '').strip().lower()
 
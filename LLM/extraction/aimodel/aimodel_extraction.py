@@ -1,7 +1,10 @@
 from extraction.Extraction import Extraction
-from utils.llm import openai_client,gemini_model
+from utils.llm import openai_client,gemini_model,EXTRACTION_TEMPERATURE
 from utils.prompt import  aimodel_extraction_promt1
 from utils.log import logger
+from utils import llm_cache, metrics, prompt_cache
+from utils.executor import map_llm_pages
+from extraction import extraction_planner
 import os
 
 class AIMODELExtractor(Extraction):
@@ -10,31 +13,42 @@ class AIMODELExtractor(Extraction):
         self.model = model  
 
     def define_prompt(self, templates, doc_name):
+        """(prompt, template entities) for a page's class; pages run concurrently, so nothing is kept on self."""
+        SYSTEMP_PROMT, template_entities = prompt_cache.compiled_prompt(
+            "extraction", templates, doc_name['class_name'],
+            lambda: self.build_prompt(templates, doc_name),
+        )
+        # match_actual_entities writes the matched values into these dicts, so every page gets its own copies.
+        template_entities = [dict(entity) for entity in template_entities]
+
+        logger.info("Extraction:: STEP1: Extraction Entity and Description has sent to Model Prompt")
+
+        return SYSTEMP_PROMT, template_entities
+
+    def build_prompt(self, templates, doc_name):
+        """(prompt, template entities) for the class of doc_name within a template set."""
         doc_template = next(
         (template for template in templates if template['document_name'] == doc_name['class_name']),{})
-                                                                                                                                                                                                    
+
         customer_type = str(doc_template.get('customer_type', '')).lower()
 
         is_individual = customer_type == 'individual'
-        
 
-    
         SYSTEMP_PROMT = aimodel_extraction_promt1()
 
         formatted_string = ""
-        
-        self.template_entities = doc_template.get('related_entities', [])
+
+        template_entities = doc_template.get('related_entities', [])
+        # Classes without a template ("Others") get an empty entity list instead of failing.
+        filter_entities = []
 
         if is_individual:
             # Case 1: Individual
             filter_entities = [
-                            e for e in self.template_entities
+                            e for e in template_entities
                             if e.get("entity_key_customer_type", "").lower() in ["individual","both"]
                         ]
-       
-
 
-    
         # Format the prompt input
         formatted_string = "\n\n".join([
             f'entity_name: "{ent_name}", entity_description: "{ent.get("entity_description", f"This is the **{ent_name}**. Provide the exact value as it appears in the document.")}"'
@@ -42,12 +56,9 @@ class AIMODELExtractor(Extraction):
             for ent_name in [ent["entity_name"]]
         ])
 
-
         SYSTEMP_PROMT = SYSTEMP_PROMT.replace("entities_list", formatted_string)
 
-        logger.info("Extraction:: STEP1: Extraction Entity and Description has sent to Model Prompt")
-
-        return SYSTEMP_PROMT
+        return SYSTEMP_PROMT, tuple(template_entities)
 
 
 
@@ -82,9 +93,12 @@ class AIMODELExtractor(Extraction):
 
             prompt = "\n\n".join(text_parts)
 
-            response = gemini_model.generate_content(prompt)
-            output_text = response.text
-            return output_text
+            return llm_cache.cached_completion(
+                "gemini", os.getenv("GEMINI_MODEL"), EXTRACTION_TEMPERATURE, messages,
+                lambda: gemini_model.generate_content(
+                    prompt, generation_config={"temperature": EXTRACTION_TEMPERATURE}
+                ).text,
+            )
 
         except Exception as e:
             logger.error(f"Gemini Extraction Error: {e}")
@@ -95,64 +109,90 @@ class AIMODELExtractor(Extraction):
         try:
             logger.info(f"Extraction:: Sending request to OpenAI")
 
-            response = openai_client.chat.completions.create(
-                model=os.getenv("OPENAI_EXTRACTION_MODEL"),
-                messages=messages,
-                temperature=0.7,
-                max_tokens=1024,
+            model_name = os.getenv("OPENAI_EXTRACTION_MODEL")
+            return llm_cache.cached_completion(
+                "openai", model_name, EXTRACTION_TEMPERATURE, messages,
+                lambda: openai_client.chat.completions.create(
+                    model=model_name,
+                    messages=messages,
+                    temperature=EXTRACTION_TEMPERATURE,
+                    max_tokens=1024,
+                ).choices[0].message.content,
             )
-            return response.choices[0].message.content
 
         except Exception as e:
             logger.error(f"OpenAI Extraction Error: {e}")
             return "{}"
 
     def extract_pages(self, templates, doc_name=1):
-        for page_number, image in self.document.pagewise_images.items():
-
-            ocr_text = self.document.pagewise_text.get(page_number, [])
-            ocr_text_str = ""
-            if ocr_text:
-                if isinstance(ocr_text[0], dict) and "text" in ocr_text[0]:
-                    ocr_text_str = ocr_text[0]["text"]
-                elif isinstance(ocr_text[0], str):
-                    ocr_text_str = ocr_text[0]
-
-            messages = [
-                {
-                    "role": "system",
-                    "content": (
-                        "You are an intelligent document parsing assistant. Your job is to extract structured information "
-                        "from OCR-scanned text into a valid JSON object from the given entity list in the user prompt."
-                    )
-                },
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": f"OCR Text:\n{ocr_text_str.strip()}"},
-                        {"type": "text", "text": self.define_prompt(templates, self.document.pagewise_classification.get(page_number))},
-                    ],
-                }
-            ]
-
+        """Extract all pages concurrently on the LLM pool; a document takes as long as its slowest page."""
+        # Repeats of a single-page class run after every other page, so the planner can see whether
+        # an earlier page of the class already yielded all of its entities.
+        repeats = [
+            page_number for page_number in self.document.pagewise_images
+            if extraction_planner.is_repeat_candidate(self.document, page_number)
+        ]
+        pages = [(page_number, templates) for page_number in self.document.pagewise_images if page_number not in repeats]
+        with metrics.timer("extraction.document"):
+            for _ in map_llm_pages(self.extract_page, pages):
+                pass
+            for _ in map_llm_pages(self.extract_page, [(page_number, templates, True) for page_number in repeats]):
+                pass
+
+    def extract_page(self, page_number, templates, skip_duplicates=False):
+        """Extract the entities of a single, already classified page."""
+        ocr_text = self.document.pagewise_text.get(page_number, [])
+        ocr_text_str = ""
+        prompt, template_entities = self.define_prompt(templates, self.document.pagewise_classification.get(page_number))
+        decision = extraction_planner.plan_page(self.document, page_number, template_entities, skip_duplicates)
+        extraction_planner.record_plan(self.document, page_number, decision)
+        if decision != extraction_planner.EXTRACT:
+            logger.info(f"Extraction:: Page {page_number} skipped ({decision})")
+            self.document.add_entities_to_page(page_number, [])
+            return
+
+        if ocr_text:
+            if isinstance(ocr_text[0], dict) and "text" in ocr_text[0]:
+                ocr_text_str = ocr_text[0]["text"]
+            elif isinstance(ocr_text[0], str):
+                ocr_text_str = ocr_text[0]
+
+        messages = [
+            {
+                "role": "system",
+                "content": (
+                    "You are an intelligent document parsing assistant. Your job is to extract structured information "
+                    "from OCR-scanned text into a valid JSON object from the given entity list in the user prompt."
+                )
+            },
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": f"OCR Text:\n{ocr_text_str.strip()}"},
+                    {"type": "text", "text": prompt},
+                ],
+            }
+        ]
+
+        with metrics.timer("extraction.llm"):
             if self.model == "openai":
                 output_text = self.prediction_OPENAI(messages)
             elif self.model == "gemini":
                 output_text = self.prediction_GEMINI(messages)
             else:
                 logger.error(f"Extraction:: Unsupported model type: {self.model}")
-                continue
+                return
 
-            logger.info(f"Extraction:: STEP 2: Extraction result received from {self.model.upper()} model {output_text}")
+        logger.info(f"Extraction:: STEP 2: Extraction result received from {self.model.upper()} model {output_text}")
 
-            try:
-                extracted_data = self.response_cleaning(output_text)
-                customer_type = self.document.page_customer_type.get(page_number, None)
-                matched_entities = self.match_actual_entities(extracted_data.copy(), customer_type)
+        try:
+            extracted_data = self.response_cleaning(output_text)
+            customer_type = self.document.page_customer_type.get(page_number, None)
+            matched_entities = self.match_actual_entities(extracted_data.copy(), customer_type, template_entities)
 
-                logger.info(f" Extraction :: {customer_type} Value - page number {page_number}\n{extracted_data}")
-                self.document.add_entities_to_page(page_number, matched_entities)
-                logger.info(f"Extraction:: STEP3: Page Number {page_number} Extracted result has cleaned")
+            logger.info(f" Extraction :: {customer_type} Value - page number {page_number}\n{extracted_data}")
+            self.document.add_entities_to_page(page_number, matched_entities)
+            logger.info(f"Extraction:: STEP3: Page Number {page_number} Extracted result has cleaned")
 
-            except Exception as e:
-                logger.error(f"Error parsing extraction results for page {page_number}: {e}")
+        except Exception as e:
+            logger.error(f"Error parsing extraction results for page {page_number}: {e}")
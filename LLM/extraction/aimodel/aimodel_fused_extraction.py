@@ -0,0 +1,162 @@
+from extraction.aimodel.aimodel_extraction import AIMODELExtractor
+from utils.prompt import aimodel_fused_promt_level1
+from utils.log import logger
+from utils import metrics, prompt_cache
+from extraction import extraction_planner
+from dotenv import load_dotenv
+import json
+import os
+import re
+
+load_dotenv()
+
+# "fused" classifies and extracts a page with one LLM request; "two_step" (default) sends
+# the page to the classification model first and to the extraction model afterwards.
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "two_step").lower()
+# Fused answers below this self-reported confidence are redone with the two-step flow.
+FUSED_MIN_CONFIDENCE = float(os.getenv("FUSED_MIN_CONFIDENCE", 0.7))
+
+
+class AIMODELFusedExtractor(AIMODELExtractor):
+    def __init__(self, document, model, classifier_model):
+        super().__init__(document, model)
+        # Used for the local first stages and for the two-step fallback.
+        self.classifier_model = classifier_model
+
+    def define_fused_prompt(self, templates):
+        prompt, class_names = prompt_cache.compiled_prompt(
+            "fused", templates, None, lambda: self.build_fused_prompt(templates)
+        )
+        return prompt, class_names
+
+    def build_fused_prompt(self, templates):
+        """(prompt, class names) listing every class with its entities; (None, None) when no prompt applies."""
+        if self.classifier_model.template_customer_type(templates) != "individual":
+            return None, None
+
+        sections = []
+        for template in templates:
+            entities = [
+                entity for entity in template.get("related_entities", [])
+                if entity.get("entity_key_customer_type", "").lower() in ["individual", "both"]
+            ]
+            entity_lines = "\n".join(
+                f'  - entity_name: "{entity["entity_name"]}", entity_description: "'
+                f'{entity.get("entity_description", "This is the **" + entity["entity_name"] + "**. Provide the exact value as it appears in the document.")}"'
+                for entity in entities
+            )
+            sections.append(
+                f"Class: {template['document_name']}\n Definition:\n{template.get('description', '')}\n"
+                f" Entities:\n{entity_lines or '  (none)'}\n"
+            )
+
+        class_names = tuple(template["document_name"] for template in templates)
+        prompt = aimodel_fused_promt_level1().format(
+            template_definition="\n".join(sections),
+            class_name=", ".join(class_names + ("Others",)),
+        )
+        return prompt, class_names
+
+    def parse_fused_response(self, output_text, class_names):
+        """(class_name, confidence, entities) from a fused answer; None when it is unusable or not confident."""
+        cleaned = re.sub(r"^```(?:json)?|```$", "", output_text.strip()).strip()
+        answer = json.loads(cleaned)
+        if not isinstance(answer, dict):
+            return None
+
+        class_name = str(answer.get("class_name") or "").strip()
+        if class_name not in class_names and class_name != "Others":
+            return None
+        try:
+            confidence = float(answer.get("confidence", 0))
+        except (TypeError, ValueError):
+            return None
+        if confidence < FUSED_MIN_CONFIDENCE:
+            return None
+
+        entities = answer.get("entities") or {}
+        if not isinstance(entities, dict):
+            return None
+        return class_name, confidence, entities
+
+    def process_page(self, page_number, templates, level=None):
+        """Classify and extract one page, with a single request when the fused answer is usable."""
+        level = level or 1
+        if self.classifier_model.classify_page_locally(page_number, templates, level):
+            self.document.unify_page_classification(page_number)
+            self.extract_page(page_number, templates)
+            return
+
+        if not self.fused_page(page_number, templates, level):
+            metrics.increment("pipeline.fused.fallback_pages")
+            self.classifier_model.classify_page_number(page_number, templates, level, local=False)
+            self.document.unify_page_classification(page_number)
+            self.extract_page(page_number, templates)
+
+    def fused_page(self, page_number, templates, level):
+        """True when the page was classified and extracted by one fused request."""
+        # Blank pages take the two-step path, where the cheaper classification request settles them.
+        if self.document.is_blank_page(page_number):
+            return False
+
+        prompt, class_names = self.define_fused_prompt(templates)
+        if prompt is None:
+            return False
+
+        messages = [
+            {
+                "role": "system",
+                "content": (
+                    "You are a document classification and parsing assistant. Classify the page into one of the "
+                    "classes in the user prompt and extract that class's entities into a valid JSON object."
+                ),
+            },
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": f"OCR Text:\n{self.document.page_text(page_number).strip()}"},
+                    {"type": "text", "text": prompt},
+                ],
+            },
+        ]
+
+        try:
+            with metrics.timer("pipeline.fused.llm"):
+                if self.model == "openai":
+                    output_text = self.prediction_OPENAI(messages)
+                elif self.model == "gemini":
+                    output_text = self.prediction_GEMINI(messages)
+                else:
+                    logger.error(f"Fused:: Unsupported model type: {self.model}")
+                    return False
+            logger.info(f"Fused:: Page {page_number} result from {self.model.upper()} model {output_text}")
+            answer = self.parse_fused_response(output_text, class_names)
+        except Exception as e:
+            logger.warning(f"Fused:: Page {page_number} answer could not be used, falling back to two steps: {e}")
+            return False
+
+        if answer is None:
+            logger.info(f"Fused:: Page {page_number} class is ambiguous, falling back to two steps")
+            return False
+
+        class_name, confidence, entities = answer
+        self.classifier_model.set_page_customer_type(page_number, templates)
+        self.document.classify_page(page_number, {
+            "class_name": class_name,
+            "score": round(min(confidence, 1.0), 4),
+            "technique": f"{self.model} fused - level {level}",
+        })
+        self.document.unify_page_classification(page_number)
+
+        # The request is already spent, but the page gets the same plan entry (and status) as in two steps.
+        _, template_entities = self.define_prompt(templates, {"class_name": class_name})
+        decision = extraction_planner.plan_page(self.document, page_number, template_entities)
+        extraction_planner.record_plan(self.document, page_number, decision, saved_call=False)
+        matched_entities = []
+        if decision == extraction_planner.EXTRACT:
+            customer_type = self.document.page_customer_type.get(page_number)
+            matched_entities = self.match_actual_entities(self.flatten_entities(entities), customer_type, template_entities)
+        self.document.add_entities_to_page(page_number, matched_entities)
+        metrics.increment("pipeline.fused.pages")
+        metrics.increment("classification.routed.fused")
+        return True
@@ -0,0 +1,134 @@
+from utils import metrics
+from utils.log import logger
+from dotenv import load_dotenv
+import os
+
+load_dotenv()
+
+# Decides between classification and extraction whether a page needs an LLM extraction at all.
+EXTRACTION_PLANNER_ENABLED = os.getenv("EXTRACTION_PLANNER_ENABLED", "true").lower() == "true"
+# Opt-in list of classes that only count once per document. A later page of such a class is not
+# extracted when an earlier page of the class already yielded every entity the class defines.
+EXTRACTION_SINGLE_PAGE_CLASSES = {
+    class_name.strip().lower()
+    for class_name in os.getenv("EXTRACTION_SINGLE_PAGE_CLASSES", "").split(",")
+    if class_name.strip()
+}
+
+EXTRACT = "extract"
+SKIP_REASONS = ("blank_page", "no_entity_template", "duplicate_class")
+
+
+def matchable_entities(template_entities, customer_type):
+    """Template entities that match_actual_entities can return for this customer type."""
+    if customer_type != "individual":
+        return []
+    return [
+        entity for entity in template_entities
+        if entity.get("entity_key_customer_type", "").strip().lower() in ("individual", "both")
+    ]
+
+
+def page_class(document, page_number):
+    classification = document.pagewise_classification.get(page_number)
+    # Only unified classifications (dicts) are settled; conflicting pages are not compared.
+    if isinstance(classification, dict):
+        return str(classification.get("class_name", "")).lower()
+    return ""
+
+
+def is_repeat_candidate(document, page_number):
+    """True when the page has a single-page class that an earlier page of the document shares."""
+    class_name = page_class(document, page_number)
+    if class_name not in EXTRACTION_SINGLE_PAGE_CLASSES:
+        return False
+    return any(
+        page_class(document, other_page) == class_name
+        for other_page in list(document.pagewise_classification) if other_page < page_number
+    )
+
+
+def complete_earlier_page(document, page_number, class_name, required_names):
+    """Lowest earlier page of class_name whose extraction already has a value for every required entity."""
+    for other_page in sorted(list(document.pagewise_classification)):
+        if other_page >= page_number:
+            break
+        if page_class(document, other_page) != class_name:
+            continue
+        extractions = document.pagewise_entities.get(other_page) or [[]]
+        found = {
+            str(entity.get("entity_name", "")).strip().lower()
+            for entity in extractions[0]
+            if entity.get("entity_value")
+        }
+        if required_names <= found:
+            return other_page
+    return None
+
+
+def plan_page(document, page_number, template_entities, skip_duplicates=False):
+    """"extract" when the page needs an LLM extraction, otherwise the reason it is skipped.
+
+    Repeats of a single-page class are only considered with `skip_duplicates`, which callers pass once
+    every earlier page has been extracted, so the decision never depends on page timing.
+    """
+    if not EXTRACTION_PLANNER_ENABLED:
+        return EXTRACT
+
+    if document.is_blank_page(page_number):
+        return "blank_page"
+
+    customer_type = document.page_customer_type.get(page_number)
+    entities = matchable_entities(template_entities, customer_type)
+    if not entities:
+        return "no_entity_template"
+
+    class_name = page_class(document, page_number)
+    if skip_duplicates and class_name in EXTRACTION_SINGLE_PAGE_CLASSES:
+        required_names = {str(entity.get("entity_name", "")).strip().lower() for entity in entities}
+        first_page = complete_earlier_page(document, page_number, class_name, required_names)
+        if first_page is not None:
+            logger.info(f"Extraction plan:: page {page_number} repeats {class_name}, already complete on page {first_page}")
+            return "duplicate_class"
+
+    return EXTRACT
+
+
+def record_plan(document, page_number, decision, saved_call=True):
+    """Keep the decision on the document; `saved_call` is False when the LLM request was spent anyway (fused)."""
+    document.extraction_plan[page_number] = decision
+    if not saved_call:
+        return
+    metrics.increment("extraction.plan.pages")
+    if decision != EXTRACT:
+        document.skipped_extractions[page_number] = decision
+        metrics.increment(f"extraction.plan.skipped.{decision}")
+
+
+def log_plan(document):
+    """Log the plan of one document: pages extracted and LLM calls saved per reason."""
+    plan = document.extraction_plan
+    skipped = {reason: 0 for reason in SKIP_REASONS}
+    for decision in document.skipped_extractions.values():
+        skipped[decision] = skipped.get(decision, 0) + 1
+    saved = sum(skipped.values())
+    logger.info(
+        f"Extraction plan:: {document.upload_name or 'document'}: {len(plan) - saved} of {len(plan)} pages extracted, "
+        f"{saved} LLM calls saved {skipped}"
+    )
+
+
+def plan_stats():
+    """Pages skipped per reason and the extraction time they saved, from the average LLM extraction."""
+    llm = metrics.get_timing("extraction.llm")
+    llm_avg = llm["total_seconds"] / llm["count"] if llm["count"] else 0.0
+    skipped = {reason: metrics.get_counter(f"extraction.plan.skipped.{reason}") for reason in SKIP_REASONS}
+    return {
+        "pages": metrics.get_counter("extraction.plan.pages"),
+        "skipped": skipped,
+        "avg_llm_seconds": llm_avg,
+        "estimated_seconds_saved": sum(skipped.values()) * llm_avg,
+    }
+
+
+metrics.register_gauge("extraction.plan", plan_stats)
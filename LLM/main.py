@@ -1,78 +1,248 @@
 import utils.load_env
 from utils.log import setup_logger, logger
 logger = setup_logger()
-from quart import Quart, request, jsonify
+from quart import Quart, request, jsonify, Response
 from quart_cors import cors
+import asyncio
 import json
-from doc_extractor_executer import start_doc_extractor
+from doc_extractor_executer import start_doc_extractor, stream_doc_extractor
+from utils.executor import run_document_task, iterate_document_task
+from utils.job_store import job_store, COMPLETED, FAILED
+from utils import metrics
 from dotenv import load_dotenv
 load_dotenv()
 import os
 
 app = Quart(__name__)
-app = cors(app, allow_origin="*")  
+app = cors(app, allow_origin="*")
 
 logger.info("--------------------------------------------------------------------------------------")
 logger.info("Server started.")
 
-     
+
 app.config['MAX_CONTENT_LENGTH'] = 100 * 1024 * 1024  # 100 MB
 
-@app.route('/up_doc', methods=['POST','GET'])
-async def process_docdata():
-    if request.method == 'GET':
-        
-        return jsonify({"message": "This is GET"})
+ALLOWED_EXTENSIONS={"tiff", "tif", "pdf","png","jpeg","jpg"}
 
-    if request.method == "POST":
-        form_data = await request.form  
 
-        json_data = form_data.get('json') 
-      
+async def parse_upload():
+    """Read template json and files from the form. Returns (document_data, uploads, error_response)."""
+    form_data = await request.form
 
-        force_individual =True
+    json_data = form_data.get('json')
 
-        customer_rp_flag = {
-        "customer_type": "Individual" if force_individual else "Non-Individual",
-        "rp_applicable_flag": "Yes" if force_individual else "No"
-        }
 
-        if json_data:
-            json_data = json.loads(json_data)  
-            if type(json_data)  == list:
-                document_data = json_data
-            else:
-                document_data = json_data.get("data", [])
-            for item in document_data:
-                item["customer_rp_flag"] = customer_rp_flag
+    force_individual =True
+
+    customer_rp_flag = {
+    "customer_type": "Individual" if force_individual else "Non-Individual",
+    "rp_applicable_flag": "Yes" if force_individual else "No"
+    }
 
-            # document_data=json_data
+    if json_data:
+        json_data = json.loads(json_data)
+        if type(json_data)  == list:
+            document_data = json_data
         else:
-            document_data = []
-
-        logger.info(f"json_data: {document_data}")
-
-
-        files = await request.files 
-        file_list = files.getlist('files') 
- 
-        logger.info(f"file_list: {file_list}")
-        for file in file_list:
-            if file.filename == '':
-                return jsonify({"error": "One or more files have no filename"}), 400
-            
-            ALLOWED_EXTENSIONS={"tiff", "tif", "pdf","png","jpeg","jpg"} 
-            file_extension = file.filename.rsplit('.', 1)[-1].lower()
-            if file_extension not in ALLOWED_EXTENSIONS:
-                return jsonify({"error": f"Invalid file type: .{file_extension}. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"}), 400
-                
-            extracted_data = start_doc_extractor(file, document_data)
-            logger.info(f"file name {file.filename}")
-            logger.info(json.dumps(extracted_data, indent=3))
-            logger.info("request complete")
-
-    return jsonify({"extraction_status":"completed","extracted_data":extracted_data})
+            document_data = json_data.get("data", [])
+        for item in document_data:
+            item["customer_rp_flag"] = customer_rp_flag
+
+        # document_data=json_data
+    else:
+        document_data = []
+
+    logger.info(f"json_data: {document_data}")
+
+
+    files = await request.files
+    file_list = files.getlist('files')
+
+    logger.info(f"file_list: {file_list}")
+    uploads = []
+    for file in file_list:
+        if file.filename == '':
+            return document_data, [], (jsonify({"error": "One or more files have no filename"}), 400)
+
+        file_extension = file.filename.rsplit('.', 1)[-1].lower()
+        if file_extension not in ALLOWED_EXTENSIONS:
+            return document_data, [], (jsonify({"error": f"Invalid file type: .{file_extension}. Allowed types: {', '.join(ALLOWED_EXTENSIONS)}"}), 400)
+
+        uploads.append((file.filename, file.read()))
+
+    return document_data, uploads, None
+
+
+def unique_filename(filename, results):
+    if filename not in results:
+        return filename
+    stem, _, extension = filename.rpartition('.')
+    counter = 2
+    while f"{stem} ({counter}).{extension}" in results:
+        counter += 1
+    return f"{stem} ({counter}).{extension}"
+
+
+async def extract_upload(filename, file_bytes, document_data, on_start=None):
+    def extract():
+        # Runs once the document has a slot on the document executor.
+        if on_start is not None:
+            on_start()
+        return start_doc_extractor(filename, file_bytes, document_data)
+
+    try:
+        extracted_data = await run_document_task(extract)
+        logger.info(f"file name {filename}")
+        logger.info(json.dumps(extracted_data, indent=3))
+        return extracted_data
+    except Exception as e:
+        logger.error(f"Extraction failed for {filename}: {e}")
+        return {"error": str(e)}
+
+
+async def process_uploads(uploads, document_data, on_start=None):
+    """Fan every uploaded file out to the document executor and collect a per-filename result map."""
+    outputs = await asyncio.gather(
+        *(extract_upload(filename, file_bytes, document_data, on_start) for filename, file_bytes in uploads)
+    )
+
+    results = {}
+    for (filename, _), extracted_data in zip(uploads, outputs):
+        results[unique_filename(filename, results)] = extracted_data
+
+    failed = [filename for filename, data in results.items() if isinstance(data, dict) and "error" in data]
+    if results and len(failed) == len(results):
+        status = "failed"
+    elif failed:
+        status = "partial"
+    else:
+        status = "completed"
+    logger.info(f"request complete: {len(results)} file(s), {len(failed)} failed")
+
+    # A single upload keeps the original page-keyed extracted_data shape.
+    extracted_data = next(iter(results.values())) if len(results) == 1 else results
+    return {"extraction_status": status, "extracted_data": extracted_data, "results": results}
+
+
+async def stream_uploads(uploads, document_data):
+    """Yield page events from every uploaded file as soon as each page is classified and extracted."""
+    queue = asyncio.Queue()
+
+    async def stream_file(filename, file_bytes):
+        pages = 0
+        try:
+            async for page_number, page_details in iterate_document_task(stream_doc_extractor, filename, file_bytes, document_data):
+                pages += 1
+                if page_details is None:
+                    continue
+                await queue.put({"event": "page", "filename": filename, "page": page_number, **page_details})
+            await queue.put({"event": "file_complete", "filename": filename, "pages": pages})
+        except Exception as e:
+            logger.error(f"Streaming extraction failed for {filename}: {e}")
+            await queue.put({"event": "error", "filename": filename, "error": str(e)})
+
+    tasks = [asyncio.ensure_future(stream_file(filename, file_bytes)) for filename, file_bytes in uploads]
+    finished = asyncio.ensure_future(asyncio.gather(*tasks))
+    try:
+        while not (finished.done() and queue.empty()):
+            getter = asyncio.ensure_future(queue.get())
+            await asyncio.wait({getter, finished}, return_when=asyncio.FIRST_COMPLETED)
+            if getter.done():
+                yield getter.result()
+            else:
+                getter.cancel()
+        yield {"event": "done"}
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def stream_response(uploads, document_data, stream_format):
+    async def ndjson():
+        async for event in stream_uploads(uploads, document_data):
+            yield json.dumps(event) + "\n"
 
+    async def sse():
+        async for event in stream_uploads(uploads, document_data):
+            yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+
+    if stream_format == "sse":
+        response = Response(sse(), mimetype="text/event-stream")
+    else:
+        response = Response(ndjson(), mimetype="application/x-ndjson")
+    response.timeout = None
+    return response
+
+
+@app.route('/up_doc', methods=['POST','GET'])
+async def process_docdata():
+    if request.method == 'GET':
+
+        return jsonify({"message": "This is GET"})
+
+    if request.method == "POST":
+        document_data, uploads, error_response = await parse_upload()
+        if error_response:
+            return error_response
+
+        stream_format = request.args.get("stream", "").lower()
+        if stream_format in ("ndjson", "sse"):
+            return stream_response(uploads, document_data, stream_format)
+
+        response = await process_uploads(uploads, document_data)
+
+    return jsonify(response)
+
+
+async def run_job(job_id, uploads, document_data):
+    try:
+        # The job stays queued until one of its documents gets a slot, so callers can time the work itself.
+        response = await process_uploads(uploads, document_data, on_start=lambda: job_store.start(job_id))
+        job_store.update(job_id, COMPLETED, result=response)
+        logger.info(f"Job {job_id} completed")
+    except Exception as e:
+        logger.error(f"Job {job_id} failed: {e}")
+        job_store.update(job_id, FAILED, error=str(e))
+
+
+@app.route('/jobs', methods=['POST'])
+async def submit_job():
+    document_data, uploads, error_response = await parse_upload()
+    if error_response:
+        return error_response
+    if not uploads:
+        return jsonify({"error": "No files uploaded"}), 400
+
+    job_id = job_store.create([filename for filename, _ in uploads])
+    app.add_background_task(run_job, job_id, uploads, document_data)
+    logger.info(f"Job {job_id} queued for {len(uploads)} file(s)")
+    return jsonify({"job_id": job_id, "status": "queued"}), 202
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+async def get_job_status(job_id):
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    job.pop("result")
+    return jsonify(job)
+
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+async def get_job_result(job_id):
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    if job["status"] == FAILED:
+        return jsonify({"job_id": job_id, "status": FAILED, "error": job["error"]}), 500
+    if job["status"] != COMPLETED:
+        return jsonify({"job_id": job_id, "status": job["status"]}), 202
+    return jsonify(job["result"])
+
+
+@app.route('/metrics', methods=['GET'])
+async def get_metrics():
+    return jsonify(metrics.snapshot())
 
 
 if __name__ == '__main__':
@@ -0,0 +1,177 @@
+import os
+import threading
+import time
+import cv2
+from io import BytesIO
+from requests.adapters import HTTPAdapter
+from azure.cognitiveservices.vision.computervision import ComputerVisionClient
+from msrest.authentication import CognitiveServicesCredentials
+from utils import metrics
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ocrEndpoint = os.getenv("ocrEndpoint")
+subscriptionKey = os.getenv("subscriptionKey")
+
+# Read API polling: short first wait, then exponential backoff capped at READ_POLL_MAX_DELAY.
+# A Retry-After header from Azure overrides the computed delay.
+READ_POLL_INITIAL_DELAY = float(os.getenv("READ_POLL_INITIAL_DELAY", 0.25))
+READ_POLL_BACKOFF = float(os.getenv("READ_POLL_BACKOFF", 1.5))
+READ_POLL_MAX_DELAY = float(os.getenv("READ_POLL_MAX_DELAY", 2))
+READ_TIMEOUT = float(os.getenv("READ_TIMEOUT", 120))
+
+# One long-lived client per process. msrest keeps one requests.Session per thread when
+# keep_alive is on; all of them mount the same adapter, so every page and document worker
+# draws from one keep-alive pool of at most AZURE_POOL_MAXSIZE connections to Azure.
+AZURE_POOL_MAXSIZE = int(os.getenv("AZURE_POOL_MAXSIZE", 16))
+
+# Upload preparation: pages are never upscaled, wider pages are reduced to OCR_UPLOAD_MAX_WIDTH,
+# colour is dropped unless OCR_UPLOAD_GRAYSCALE is off, and JPEG quality is tunable.
+OCR_UPLOAD_MAX_WIDTH = int(os.getenv("OCR_UPLOAD_MAX_WIDTH", 2000))
+OCR_UPLOAD_GRAYSCALE = os.getenv("OCR_UPLOAD_GRAYSCALE", "true").lower() == "true"
+OCR_UPLOAD_JPEG_QUALITY = int(os.getenv("OCR_UPLOAD_JPEG_QUALITY", 85))
+
+_client = None
+_client_lock = threading.Lock()
+_adapter = None
+
+
+def prepare_for_upload(image):
+    """Grayscale and downscale a BGR(A) page array for the Read API; coordinates come back in its frame."""
+    if image.ndim == 3 and image.shape[2] == 4:
+        image = cv2.cvtColor(image, cv2.COLOR_BGRA2GRAY if OCR_UPLOAD_GRAYSCALE else cv2.COLOR_BGRA2BGR)
+    elif image.ndim == 3 and OCR_UPLOAD_GRAYSCALE:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+    (h, w) = image.shape[:2]
+    if w > OCR_UPLOAD_MAX_WIDTH:
+        size = (OCR_UPLOAD_MAX_WIDTH, max(1, int(h * OCR_UPLOAD_MAX_WIDTH / float(w))))
+        image = cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+    return image
+
+
+def encode_image(image):
+    """JPEG-encode an image array into an in-memory stream for upload."""
+    success, buffer = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, OCR_UPLOAD_JPEG_QUALITY])
+    if not success:
+        raise ValueError("Could not encode image as JPEG")
+    return BytesIO(buffer.tobytes())
+
+
+def retry_after_seconds(headers):
+    """Seconds requested by a Retry-After header, or None."""
+    value = headers.get("Retry-After") if headers else None
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+class ReadPoller:
+    """Decides how long to wait between get_read_result calls for one operation."""
+
+    def __init__(self):
+        self.delay = READ_POLL_INITIAL_DELAY
+        self.polls = 0
+        self.deadline = time.monotonic() + READ_TIMEOUT
+
+    def next_delay(self, headers):
+        if time.monotonic() > self.deadline:
+            raise TimeoutError(f"Azure Read did not finish within {READ_TIMEOUT}s")
+        self.polls += 1
+        delay = retry_after_seconds(headers)
+        if delay is None:
+            delay = self.delay
+            self.delay = min(self.delay * READ_POLL_BACKOFF, READ_POLL_MAX_DELAY)
+        return delay
+
+
+def _shared_adapter(global_config):
+    """The pooled adapter mounted on every worker thread's session, created on first use."""
+    global _adapter
+    if _adapter is None:
+        with _client_lock:
+            if _adapter is None:
+                _adapter = HTTPAdapter(pool_maxsize=AZURE_POOL_MAXSIZE, max_retries=global_config.retry_policy())
+    return _adapter
+
+
+def _configure_session(session, global_config, local_config, **kwargs):
+    """msrest session callback: mount the shared adapter once on every new thread-local session."""
+    if not getattr(session, "_idp_pooled", False):
+        adapter = _shared_adapter(global_config)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session._idp_pooled = True
+        metrics.increment("azure_read.sessions")
+    return kwargs
+
+
+def get_client():
+    """Shared ComputerVisionClient with keep-alive sessions, created on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                client = ComputerVisionClient(ocrEndpoint, CognitiveServicesCredentials(subscriptionKey))
+                client.config.keep_alive = True
+                client.config.session_configuration_callback = _configure_session
+                _client = client
+    return _client
+
+
+def connection_stats():
+    """New TCP/TLS connections versus requests sent over the shared pool."""
+    connections = 0
+    requests_sent = 0
+    if _adapter is not None:
+        for key in _adapter.poolmanager.pools.keys():
+            pool = _adapter.poolmanager.pools.get(key)
+            if pool is not None:
+                connections += pool.num_connections
+                requests_sent += pool.num_requests
+    return {
+        "max_connections": AZURE_POOL_MAXSIZE,
+        "connections_opened": connections,
+        "requests": requests_sent,
+        "reused_requests": max(0, requests_sent - connections),
+    }
+
+
+metrics.register_gauge("azure_read.connections", connection_stats)
+
+
+def submit_read(client, image):
+    stream = encode_image(image)
+    metrics.increment("ocr.upload.images")
+    metrics.increment("ocr.upload.bytes", stream.getbuffer().nbytes)
+    read_response = client.read_in_stream(stream, raw=True)
+    return read_response.headers["Operation-Location"].split("/")[-1]
+
+
+def fetch_read_result(client, operation_id):
+    """Return (read_result, finished, response_headers) for a submitted Read operation."""
+    raw_result = client.get_read_result(operation_id, raw=True)
+    read_result = raw_result.output
+    finished = read_result.status not in ['notStarted', 'running']
+    return read_result, finished, raw_result.response.headers
+
+
+def read_image(image):
+    """Upload an image array to the Azure Read API and wait for the result."""
+    start = time.perf_counter()
+    client = get_client()
+    operation_id = submit_read(client, image)
+
+    poller = ReadPoller()
+    while True:
+        read_result, finished, headers = fetch_read_result(client, operation_id)
+        if finished:
+            break
+        time.sleep(poller.next_delay(headers))
+
+    metrics.observe("ocr.read", time.perf_counter() - start)
+    metrics.increment("ocr.read.polls", poller.polls + 1)
+    return read_result
+
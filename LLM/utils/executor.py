@@ -0,0 +1,124 @@
+import asyncio
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from dotenv import load_dotenv
+from utils.log import logger
+
+load_dotenv()
+
+
+# Document pipelines block on Azure polling and the OpenAI/Gemini SDKs, so they
+# run on worker threads instead of the Quart event loop.
+DOC_WORKERS = int(os.getenv("DOC_WORKERS", 4))
+MAX_DOCS_IN_FLIGHT = int(os.getenv("MAX_DOCS_IN_FLIGHT", DOC_WORKERS))
+
+document_executor = ThreadPoolExecutor(max_workers=DOC_WORKERS, thread_name_prefix="doc-worker")
+logger.info(f"Document executor started with {DOC_WORKERS} workers, {MAX_DOCS_IN_FLIGHT} documents in flight.")
+
+# Per-page OCR work (rotation + Read API) is shared by all documents; each document
+# keeps at most OCR_PAGE_CONCURRENCY of its pages in flight.
+OCR_PAGE_WORKERS = int(os.getenv("OCR_PAGE_WORKERS", 8))
+OCR_PAGE_CONCURRENCY = int(os.getenv("OCR_PAGE_CONCURRENCY", 4))
+
+page_executor = ThreadPoolExecutor(max_workers=OCR_PAGE_WORKERS, thread_name_prefix="page-worker")
+
+# Per-page LLM calls (extraction, streamed classification) get their own pool so they never
+# queue behind OCR work; utils.rate_limit keeps the combined request rate within the provider limits.
+LLM_PAGE_WORKERS = int(os.getenv("LLM_PAGE_WORKERS", 16))
+LLM_PAGE_CONCURRENCY = int(os.getenv("LLM_PAGE_CONCURRENCY", 8))
+
+llm_executor = ThreadPoolExecutor(max_workers=LLM_PAGE_WORKERS, thread_name_prefix="llm-worker")
+
+_doc_semaphore = None
+
+
+def _get_doc_semaphore():
+    """Create the in-flight limiter lazily so it binds to the server's event loop."""
+    global _doc_semaphore
+    if _doc_semaphore is None:
+        _doc_semaphore = asyncio.Semaphore(MAX_DOCS_IN_FLIGHT)
+    return _doc_semaphore
+
+
+def map_pages(func, items, limit=None, executor=None):
+    """Run func(*item) for every item on the page executor and yield the results in input order.
+
+    Items are pulled lazily and at most `limit` of them are in flight, so a generator of
+    page images never materialises more than `limit` pages at once.
+    """
+    limit = max(1, limit or OCR_PAGE_CONCURRENCY)
+    executor = executor or page_executor
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(executor.submit(func, *item))
+            if len(pending) >= limit:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+async def run_document_task(func, *args, **kwargs):
+    """Run a blocking document pipeline on the document executor without blocking the event loop."""
+    async with _get_doc_semaphore():
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(document_executor, partial(func, *args, **kwargs))
+
+
+async def iterate_document_task(func, *args, **kwargs):
+    """Drive a blocking generator on the document executor and yield its items as they are produced.
+
+    If the consumer stops early (e.g. a streaming client disconnects), the producer is told to stop
+    before its next page and the document slot is held until the worker has actually finished.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    finished = object()
+    cancelled = threading.Event()
+
+    def put(item, error=None):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, (item, error))
+        except RuntimeError:
+            # The event loop is closed; nobody is listening any more.
+            cancelled.set()
+
+    def produce():
+        generator = func(*args, **kwargs)
+        try:
+            for item in generator:
+                if cancelled.is_set():
+                    break
+                put(item)
+        except Exception as error:
+            put(None, error)
+        finally:
+            # Closing the generator runs its cleanup, e.g. cancelling pages still queued on the pools.
+            generator.close()
+            put(finished)
+
+    async with _get_doc_semaphore():
+        future = loop.run_in_executor(document_executor, produce)
+        try:
+            while True:
+                item, error = await queue.get()
+                if error is not None:
+                    raise error
+                if item is finished:
+                    break
+                yield item
+        finally:
+            if not future.done():
+                cancelled.set()
+                logger.info("Document stream abandoned, stopping its worker after the current page")
+            await asyncio.shield(future)
+
+def map_llm_pages(func, items):
+    """map_pages on the LLM pool, LLM_PAGE_CONCURRENCY pages of a document at a time."""
+    return map_pages(func, items, LLM_PAGE_CONCURRENCY, llm_executor)
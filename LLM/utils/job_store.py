@@ -0,0 +1,150 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from dotenv import load_dotenv
+from utils.log import logger
+
+load_dotenv()
+
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", "jobs.db")
+JOB_RETENTION_HOURS = float(os.getenv("JOB_RETENTION_HOURS", 24))
+# Unfinished jobs of another host that have not changed for this long are considered abandoned.
+JOB_STALE_HOURS = float(os.getenv("JOB_STALE_HOURS", 2))
+
+PROCESS_INSTANCE = uuid.uuid4().hex[:12]
+PROCESS_OWNER = f"{socket.gethostname()}:{os.getpid()}:{PROCESS_INSTANCE}"
+
+QUEUED = "queued"
+PROCESSING = "processing"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+class JobStore:
+    """Keeps /jobs submissions and their results in a local SQLite file."""
+
+    def __init__(self, path=JOB_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    filenames TEXT,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL,
+                    updated_at REAL
+                )"""
+            )
+            # "host:pid:instance" of the process that accepted the job.
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            if "owner" not in columns:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+            self._conn.commit()
+        self.recover_interrupted()
+
+    def recover_interrupted(self):
+        """Fail unfinished jobs whose worker process is gone; jobs of live workers are left alone."""
+        stale_before = time.time() - JOB_STALE_HOURS * 3600
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT job_id, owner, updated_at FROM jobs WHERE status IN (?, ?)", (QUEUED, PROCESSING)
+            ).fetchall()
+            interrupted = [
+                job_id for job_id, owner, updated_at in rows
+                if owner_gone(owner) or (updated_at or 0) < stale_before
+            ]
+            for job_id in interrupted:
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE job_id = ?",
+                    (FAILED, "Interrupted by service restart", time.time(), job_id),
+                )
+            self._conn.commit()
+        if interrupted:
+            logger.info(f"Job store: marked {len(interrupted)} interrupted jobs as failed")
+
+    def create(self, filenames):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (job_id, status, filenames, created_at, updated_at, owner) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, QUEUED, json.dumps(filenames), now, now, PROCESS_OWNER),
+            )
+            self._conn.commit()
+        self.purge_expired()
+        return job_id
+
+    def start(self, job_id):
+        """Move a queued job to processing; later calls for the same job keep its start time."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE job_id = ? AND status = ?",
+                (PROCESSING, time.time(), job_id, QUEUED),
+            )
+            self._conn.commit()
+
+    def update(self, job_id, status, result=None, error=None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, updated_at = ? WHERE job_id = ?",
+                (status, json.dumps(result) if result is not None else None, error, time.time(), job_id),
+            )
+            self._conn.commit()
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT job_id, status, filenames, result, error, created_at, updated_at FROM jobs WHERE job_id = ?",
+                (job_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            "job_id": row[0],
+            "status": row[1],
+            "filenames": json.loads(row[2]) if row[2] else [],
+            "result": json.loads(row[3]) if row[3] else None,
+            "error": row[4],
+            "created_at": row[5],
+            "updated_at": row[6],
+        }
+
+    def purge_expired(self):
+        cutoff = time.time() - JOB_RETENTION_HOURS * 3600
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM jobs WHERE updated_at < ?", (cutoff,)).rowcount
+            self._conn.commit()
+        if deleted:
+            logger.info(f"Job store: purged {deleted} expired jobs")
+
+
+def owner_gone(owner):
+    """True when the job's owner ran on this host and that process no longer exists."""
+    try:
+        host, pid, instance = owner.split(":")
+        pid = int(pid)
+    except (AttributeError, ValueError):
+        return False
+    if host != socket.gethostname():
+        return False
+    if pid == os.getpid():
+        # Same pid but another instance: an earlier run of this process, e.g. pid 1 in a restarted container.
+        return instance != PROCESS_INSTANCE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        return False
+    return False
+
+
+job_store = JobStore()
@@ -6,6 +6,10 @@ import google.generativeai as genai
 
 load_dotenv()
 
+# Sampling temperature of each step, for OpenAI and Gemini alike. Classification is deterministic so
+# its answers can be served from the LLM cache; see LLM_CACHE_MAX_TEMPERATURE.
+CLASSIFICATION_TEMPERATURE = float(os.getenv("CLASSIFICATION_TEMPERATURE", 0))
+EXTRACTION_TEMPERATURE = float(os.getenv("EXTRACTION_TEMPERATURE", 0.7))
 
 # OpenAI
 try:
@@ -0,0 +1,67 @@
+import hashlib
+import json
+import os
+import sqlite3
+from dotenv import load_dotenv
+from utils import metrics, rate_limit
+from utils.log import logger
+from utils.sqlite_cache import SQLiteCache
+
+load_dotenv()
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.db")
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", 128))
+LLM_CACHE_TTL_HOURS = float(os.getenv("LLM_CACHE_TTL_HOURS", 168))
+# Calls sampled above this temperature are treated as non-deterministic and never cached. With the
+# defaults that caches classification (CLASSIFICATION_TEMPERATURE=0) but not extraction (0.7).
+# Calls without an explicit temperature (provider default) are never cached.
+LLM_CACHE_MAX_TEMPERATURE = float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", 0))
+
+llm_cache = SQLiteCache(
+    LLM_CACHE_PATH,
+    int(LLM_CACHE_MAX_MB * 1024 * 1024),
+    ttl_seconds=LLM_CACHE_TTL_HOURS * 3600,
+    name="llm_cache",
+) if LLM_CACHE_ENABLED else None
+
+if llm_cache is not None:
+    metrics.register_gauge("llm_cache", llm_cache.stats)
+    logger.info(f"LLM response cache enabled at {LLM_CACHE_PATH} ({LLM_CACHE_MAX_MB} MB, {LLM_CACHE_TTL_HOURS} h TTL)")
+
+
+def cache_key(provider, model, temperature, messages):
+    digest = hashlib.sha256(json.dumps(messages, sort_keys=True, default=str).encode()).hexdigest()
+    return f"{provider}:{model}:{temperature}:{digest}"
+
+
+def cached_completion(provider, model, temperature, messages, call):
+    """Return the cached response text for this exact request, or run `call()` and cache its text.
+
+    Exceptions from `call` propagate and nothing is cached, so failed requests are retried next time.
+    Cache errors only cost the cache: a failed read is a miss and a failed write is skipped.
+    Only requests that reach the provider count against its rate limit.
+    """
+    if llm_cache is None or temperature is None or temperature > LLM_CACHE_MAX_TEMPERATURE:
+        return rate_limit.limited_call(provider, messages, call)
+
+    key = cache_key(provider, model, temperature, messages)
+    try:
+        cached = llm_cache.get(key)
+    except sqlite3.Error as e:
+        logger.warning(f"LLM cache read failed, treating as a miss: {e}")
+        metrics.increment("llm_cache.errors")
+        cached = None
+    if cached is not None:
+        metrics.increment(f"llm_cache.{provider}.hits")
+        return cached
+
+    metrics.increment(f"llm_cache.{provider}.misses")
+    output_text = rate_limit.limited_call(provider, messages, call)
+    if output_text:
+        try:
+            llm_cache.set(key, output_text)
+        except sqlite3.Error as e:
+            logger.warning(f"LLM cache write failed, response not cached: {e}")
+            metrics.increment("llm_cache.errors")
+    return output_text
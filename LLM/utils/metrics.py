@@ -0,0 +1,70 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Process-wide counters and timings, exposed through the /metrics endpoint.
+_lock = threading.Lock()
+_counters = defaultdict(float)
+_timings = defaultdict(lambda: {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+_gauges = {}
+
+
+def increment(name, value=1):
+    with _lock:
+        _counters[name] += value
+
+
+def observe(name, seconds):
+    with _lock:
+        timing = _timings[name]
+        timing["count"] += 1
+        timing["total_seconds"] += seconds
+        timing["max_seconds"] = max(timing["max_seconds"], seconds)
+
+
+@contextmanager
+def timer(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start)
+
+
+def get_counter(name):
+    with _lock:
+        return _counters.get(name, 0.0)
+
+
+def get_timing(name):
+    with _lock:
+        return dict(_timings[name]) if name in _timings else {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+
+
+def register_gauge(name, func):
+    """Register a callable evaluated on every snapshot, e.g. for pool or cache statistics."""
+    with _lock:
+        _gauges[name] = func
+
+
+def snapshot():
+    with _lock:
+        counters = dict(_counters)
+        timings = {
+            name: {
+                **timing,
+                "avg_seconds": timing["total_seconds"] / timing["count"] if timing["count"] else 0.0,
+            }
+            for name, timing in _timings.items()
+        }
+        gauges = dict(_gauges)
+
+    values = {}
+    for name, func in gauges.items():
+        try:
+            values[name] = func()
+        except Exception as e:
+            values[name] = {"error": str(e)}
+
+    return {"counters": counters, "timings": timings, "gauges": values}
@@ -0,0 +1,54 @@
+import hashlib
+import os
+import sqlite3
+from dotenv import load_dotenv
+from utils import metrics
+from utils.log import logger
+from utils.sqlite_cache import SQLiteCache
+
+load_dotenv()
+
+OCR_CACHE_ENABLED = os.getenv("OCR_CACHE_ENABLED", "true").lower() == "true"
+OCR_CACHE_PATH = os.getenv("OCR_CACHE_PATH", "ocr_cache.db")
+OCR_CACHE_MAX_MB = float(os.getenv("OCR_CACHE_MAX_MB", 512))
+
+# Entries hold the raw Read lines/words (text is laid out again on every hit, so layout changes
+# need no bump). Bump when the Read output would change for the same image, e.g. upload preparation.
+OCR_CACHE_VERSION = 2
+
+ocr_cache = SQLiteCache(OCR_CACHE_PATH, int(OCR_CACHE_MAX_MB * 1024 * 1024), name="ocr_cache") if OCR_CACHE_ENABLED else None
+
+if ocr_cache is not None:
+    metrics.register_gauge("ocr_cache", ocr_cache.stats)
+    logger.info(f"OCR cache enabled at {OCR_CACHE_PATH} ({OCR_CACHE_MAX_MB} MB)")
+
+
+def image_key(kind, image):
+    """Content address of a PIL page image: hash of its RGB pixels and size."""
+    image = image.convert("RGB")
+    digest = hashlib.sha256(image.tobytes())
+    digest.update(f"{image.size}".encode())
+    return f"v{OCR_CACHE_VERSION}:{kind}:{digest.hexdigest()}"
+
+
+def get(key):
+    """Cached value for key, or None; cache errors count as a miss so OCR goes ahead."""
+    if ocr_cache is None:
+        return None
+    try:
+        return ocr_cache.get(key)
+    except sqlite3.Error as e:
+        logger.warning(f"OCR cache read failed, treating as a miss: {e}")
+        metrics.increment("ocr_cache.errors")
+        return None
+
+
+def put(key, value):
+    """Store value under key; a cache error is logged and the OCR result is kept."""
+    if ocr_cache is None:
+        return
+    try:
+        ocr_cache.set(key, value)
+    except sqlite3.Error as e:
+        logger.warning(f"OCR cache write failed, result not cached: {e}")
+        metrics.increment("ocr_cache.errors")
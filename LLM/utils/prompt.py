@@ -39,6 +39,41 @@ def aimodel_classify_promt_level1():
 
 
 
+def aimodel_classify_batch_promt_level1():
+    return """
+    You are an advanced language model to classify the pages of a document into predefined categories based on their content, structure, and purpose.
+    The OCR text of several pages is given above, each starting with a "### Page <number>" header. Classify every page on its own.
+
+    ### Classification Rules:
+
+    1. **Strict Category Selection:**
+    - Only use the predefined categories listed below.
+    - Do not generate any category outside this list.
+
+    2. **Output Format:**
+    - Your response must be a single JSON object mapping every page number to its category name, without any additional text, formatting, or explanation.
+    - Example: `{{"1": "Passport", "2": "Others"}}`
+
+    3. **Analysis Guidelines:**
+    - Carefully analyze **sections, key features, unique identifiers, and overall context** of each page to ensure accurate classification.
+    - If multiple categories seem relevant for a page, select the **primary purpose** of that page.
+    - Analyze if any **key features** of the particular category are available on the page; if not, it should be classified as **Others**.
+
+    4. **Reject Irrelevant Inputs:**
+    - If a page contains ambiguous, irrelevant, or unclassifiable content, classify it as **"Others"**.
+
+    ### Predefined Categories & Descriptions:
+
+    {template_definition}
+
+    ### Strict Response Format:
+    Return only the JSON object with one entry per page. Each value must be exactly one of the following category names:
+
+    {class_name}
+
+    """
+
+
 
 def aimodel_extraction_promt():
     return """
@@ -153,3 +188,33 @@ def aimodel_extraction_promt1():
     </output_format>
 
     """
+
+
+
+def aimodel_fused_promt_level1():
+    return """
+    You are an advanced language model that classifies a document page into one of the predefined categories and extracts the entities defined for that category, in a single answer.
+
+    ### Step 1 - Classification Rules:
+    - Only use one of the predefined categories listed below; do not generate any category outside this list.
+    - Carefully analyze **sections, key features, unique identifiers, and overall context** of the page.
+    - If multiple categories seem relevant, select the **primary purpose** of the page.
+    - If the key features of a category are not available, or the page is ambiguous, irrelevant or unclassifiable, use **"Others"**.
+    - Report how certain you are as "confidence", a number between 0 and 1. Use a low value when two categories are plausible.
+
+    ### Step 2 - Extraction Rules (only for the chosen category):
+    - Extract only the entities listed under the chosen category, using the entity names exactly as the JSON keys.
+    - Use the entity description to find the right value. Do not guess or infer values, do not create new keys.
+    - If a value is not clearly found, **omit the key entirely** - do not return null or empty strings.
+    - Dates: Date of Birth comes before the Issuance Date, which comes before the Expiry Date. Only extract dates that are visible on the page.
+    - For "Others", return an empty "entities" object.
+
+    ### Predefined Categories, Descriptions & Entities:
+
+    {template_definition}
+
+    ### Strict Response Format:
+    Return only a single flat JSON object, without explanations or extra formatting:
+    {{"class_name": "<one of: {class_name}>", "confidence": 0.95, "entities": {{"<entity name>": "<value>"}}}}
+
+    """
@@ -0,0 +1,19 @@
+import os
+from dotenv import load_dotenv
+from utils.template_cache import TemplateCache
+
+load_dotenv()
+
+# Compiled prompts keyed by (kind, template content hash, key). Template sets rarely change,
+# so a small LRU covers every class of the active template versions.
+PROMPT_CACHE_SIZE = int(os.getenv("PROMPT_CACHE_SIZE", 256))
+
+_prompts = TemplateCache("prompt", PROMPT_CACHE_SIZE)
+
+
+def compiled_prompt(kind, templates, key, build):
+    """Return the prompt build() makes for this template set and key, building it only on the first request.
+
+    Callers must treat the returned value as read-only and copy anything they mutate.
+    """
+    return _prompts.get(kind, templates, key, build)
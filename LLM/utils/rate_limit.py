@@ -0,0 +1,99 @@
+import os
+import threading
+import time
+from dotenv import load_dotenv
+from utils import metrics
+
+load_dotenv()
+
+# Process-wide request and token budgets per LLM provider, shared by every document and page
+# worker so concurrent pages stay under the account limits. 0 disables a budget.
+RATE_LIMITS = {
+    "openai": (int(os.getenv("OPENAI_RPM", 500)), int(os.getenv("OPENAI_TPM", 200000))),
+    "gemini": (int(os.getenv("GEMINI_RPM", 300)), int(os.getenv("GEMINI_TPM", 1000000))),
+}
+# Tokens reserved for the response on top of the prompt estimate.
+LLM_OUTPUT_TOKEN_RESERVE = int(os.getenv("LLM_OUTPUT_TOKEN_RESERVE", 512))
+
+
+class RateLimiter:
+    """Token buckets for requests and tokens per minute, refilled continuously."""
+
+    def __init__(self, name, rpm, tpm):
+        self.name = name
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests = float(rpm)
+        self.tokens = float(tpm)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def refill(self, now):
+        elapsed = now - self.updated
+        self.updated = now
+        if self.rpm:
+            self.requests = min(self.rpm, self.requests + elapsed * self.rpm / 60)
+        if self.tpm:
+            self.tokens = min(self.tpm, self.tokens + elapsed * self.tpm / 60)
+
+    def wait_time(self, tokens):
+        """Seconds until one request of `tokens` fits; a request larger than the whole budget waits for a full bucket."""
+        wait = 0.0
+        if self.rpm and self.requests < 1:
+            wait = max(wait, (1 - self.requests) * 60 / self.rpm)
+        if self.tpm:
+            needed = min(tokens, self.tpm)
+            if self.tokens < needed:
+                wait = max(wait, (needed - self.tokens) * 60 / self.tpm)
+        return wait
+
+    def acquire(self, tokens):
+        start = time.monotonic()
+        while True:
+            with self.lock:
+                self.refill(time.monotonic())
+                wait = self.wait_time(tokens)
+                if wait <= 0:
+                    self.requests -= 1
+                    self.tokens -= tokens
+                    break
+            time.sleep(wait)
+
+        waited = time.monotonic() - start
+        if waited > 0.001:
+            metrics.observe(f"rate_limit.{self.name}.wait", waited)
+
+    def stats(self):
+        with self.lock:
+            self.refill(time.monotonic())
+            return {
+                "rpm": self.rpm,
+                "tpm": self.tpm,
+                "requests_available": round(self.requests, 2),
+                "tokens_available": round(self.tokens),
+            }
+
+
+limiters = {name: RateLimiter(name, rpm, tpm) for name, (rpm, tpm) in RATE_LIMITS.items()}
+for _name, _limiter in limiters.items():
+    metrics.register_gauge(f"rate_limit.{_name}", _limiter.stats)
+
+
+def estimate_tokens(messages):
+    """Rough prompt size (4 characters per token) plus the response reserve."""
+    chars = 0
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, list):
+            chars += sum(len(str(part.get("text") or "")) for part in content)
+        else:
+            chars += len(str(content or ""))
+    return chars // 4 + LLM_OUTPUT_TOKEN_RESERVE
+
+
+def limited_call(provider, messages, call):
+    """Run call() once the provider's request and token budgets allow it."""
+    limiter = limiters.get(provider)
+    if limiter is not None:
+        limiter.acquire(estimate_tokens(messages))
+    return call()
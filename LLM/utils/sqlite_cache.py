@@ -0,0 +1,133 @@
+import json
+import sqlite3
+import threading
+import time
+from utils.log import logger
+
+
+class SQLiteCache:
+    """Small JSON key/value cache on an embedded SQLite file.
+
+    Entries are evicted least-recently-used first once the stored values exceed `max_bytes`,
+    and optionally expire `ttl_seconds` after they were written. Access times are refreshed at
+    most every `touch_interval` seconds per entry, so hits rarely write. The stored size is kept
+    in the file itself, so processes sharing the file agree on when to evict.
+
+    `get` and `set` raise sqlite3.Error (e.g. a locked database or a full disk) after rolling back;
+    callers treat that as a miss or a skipped write.
+    """
+
+    def __init__(self, path, max_bytes, ttl_seconds=None, name="cache", touch_interval=300):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.name = name
+        self.touch_interval = touch_interval
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute(
+                """CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            self._conn.execute(
+                "INSERT OR IGNORE INTO meta (key, value) SELECT 'total_bytes', COALESCE(SUM(size), 0) FROM entries"
+            )
+            self._conn.commit()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT value, created_at, accessed_at FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and self.ttl_seconds is not None and now - row[1] > self.ttl_seconds:
+                    self._delete(key)
+                    self._conn.commit()
+                    row = None
+                if row is not None and now - row[2] > self.touch_interval:
+                    self._conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+                    self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        data = json.dumps(value)
+        size = len(data)
+        if size > self.max_bytes:
+            logger.info(f"{self.name}: entry of {size} bytes exceeds the cache size, not stored")
+            return
+        now = time.time()
+        with self._lock:
+            # Take the write lock up front so the size bookkeeping is consistent across processes.
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._delete(key)
+                self._conn.execute(
+                    "INSERT INTO entries (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, data, size, now, now),
+                )
+                self._add_bytes(size)
+                self._evict()
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+
+    def _total_bytes(self):
+        return self._conn.execute("SELECT value FROM meta WHERE key = 'total_bytes'").fetchone()[0]
+
+    def _add_bytes(self, size):
+        self._conn.execute("UPDATE meta SET value = value + ? WHERE key = 'total_bytes'", (size,))
+
+    def _delete(self, key):
+        row = self._conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._add_bytes(-row[0])
+
+    def _evict(self):
+        total_bytes = self._total_bytes()
+        while total_bytes > self.max_bytes:
+            rows = self._conn.execute("SELECT key, size FROM entries ORDER BY accessed_at LIMIT 64").fetchall()
+            if not rows:
+                self._conn.execute("UPDATE meta SET value = 0 WHERE key = 'total_bytes'")
+                break
+            for key, size in rows:
+                if total_bytes <= self.max_bytes:
+                    break
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._add_bytes(-size)
+                total_bytes -= size
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "bytes": self._total_bytes(),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+            }
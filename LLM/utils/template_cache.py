@@ -0,0 +1,57 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+from utils import metrics
+
+load_dotenv()
+
+# Objects derived from a template set (e.g. the TF-IDF classifier, the customer type), built once
+# per template content. Prompts have their own cache in utils.prompt_cache.
+TEMPLATE_CACHE_SIZE = int(os.getenv("TEMPLATE_CACHE_SIZE", 32))
+
+
+def template_fingerprint(templates):
+    """sha256 of the template set's content, so equal templates share entries and edits never hit stale ones."""
+    return hashlib.sha256(json.dumps(templates, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class TemplateCache:
+    """Small LRU of values built from a template set, keyed by (kind, template fingerprint, key)."""
+
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, kind, templates, key, build):
+        """Return build() for this template set and key, building it only on the first request.
+
+        Callers must treat the returned value as read-only and copy anything they mutate.
+        """
+        cache_key = (kind, template_fingerprint(templates), key)
+        with self._lock:
+            if cache_key in self._entries:
+                self._entries.move_to_end(cache_key)
+                metrics.increment(f"{self.name}.{kind}.hits")
+                return self._entries[cache_key]
+
+        with metrics.timer(f"{self.name}.{kind}.build"):
+            value = build()
+        with self._lock:
+            self._entries[cache_key] = value
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        metrics.increment(f"{self.name}.{kind}.misses")
+        return value
+
+
+_derived = TemplateCache("template", TEMPLATE_CACHE_SIZE)
+
+
+def derived_value(kind, templates, key, build):
+    """Memoised build() of a non-prompt value derived from a template set."""
+    return _derived.get(kind, templates, key, build)
@@ -2,6 +2,7 @@ import json
 import logging
 import os
 import threading
+import time
 from typing import Any, Optional
 
 import requests
@@ -24,6 +25,8 @@ MIME_TYPES = {
     "jpeg": "image/jpeg",
     "png": "image/png",
 }
+LLM_JOB_POLL_INTERVAL = float(os.getenv("LLM_JOB_POLL_INTERVAL", "2"))
+LLM_JOB_TIMEOUT = float(os.getenv("LLM_JOB_TIMEOUT", "1800"))
 
 
 def _serialize_template(template: Template) -> dict:
@@ -91,6 +94,9 @@ def _call_llm(file_path: str, filename: str, template_json: Any, llm_url: str) -
 
 
 def _parse_llm_response(resp_json: dict) -> dict:
+    if resp_json.get("extraction_status") == "failed":
+        errors = [r.get("error") for r in (resp_json.get("results") or {}).values() if isinstance(r, dict)]
+        raise RuntimeError("; ".join(e for e in errors if e) or "LLM extraction failed")
     extracted = resp_json.get("extracted_data")
     if isinstance(extracted, dict):
         return extracted
@@ -100,6 +106,128 @@ def _parse_llm_response(resp_json: dict) -> dict:
     return {"1": {"classification": {}, "extraction": []}}
 
 
+def _jobs_url(llm_url: str) -> str:
+    return llm_url.rsplit("/", 1)[0] + "/jobs"
+
+
+def _submit_llm_job(file_path: str, filename: str, template_json: Any, llm_url: str) -> str:
+    file_ext = filename.rsplit(".", 1)[-1].lower()
+    mime = MIME_TYPES.get(file_ext, "application/octet-stream")
+
+    with open(file_path, "rb") as f:
+        files_payload = [("files", (filename, f, mime))]
+        data_payload = {"json": json.dumps(template_json)}
+        response = requests.post(_jobs_url(llm_url), files=files_payload, data=data_payload, timeout=60)
+
+    response.raise_for_status()
+    job_id = response.json()["job_id"]
+    logger.info("LLM job submitted job=%s file=%s", job_id, filename)
+    return job_id
+
+
+def _response_json(response: requests.Response) -> dict:
+    try:
+        body = response.json()
+    except ValueError:
+        return {}
+    return body if isinstance(body, dict) else {}
+
+
+def _fetch_llm_job(job_id: str, llm_url: str) -> tuple[Optional[str], Optional[dict]]:
+    """Return (status, result) of a job; the result is only set once the job has completed.
+
+    Network errors and unexpected responses give (None, None), so a blip during a long job does
+    not fail the document. A job the LLM service reports as failed, or no longer knows, raises.
+    """
+    try:
+        response = requests.get(f"{_jobs_url(llm_url)}/{job_id}/result", timeout=30)
+    except requests.RequestException as exc:
+        logger.warning("LLM job %s poll failed, retrying: %s", job_id, exc)
+        return None, None
+
+    body = _response_json(response)
+    if response.status_code == 404:
+        raise RuntimeError(f"LLM job {job_id} not found: {body.get('error') or response.reason}")
+    if response.status_code == 202:
+        return body.get("status"), None
+    if body.get("status") == "failed":
+        raise RuntimeError(f"LLM job {job_id} failed: {body.get('error') or response.reason}")
+    if response.status_code != 200 or not body:
+        logger.warning("LLM job %s poll returned HTTP %s, retrying", job_id, response.status_code)
+        return None, None
+    return "completed", body
+
+
+def _check_llm_job_timeout(job_id: str, status: Optional[str], started: dict[str, float], last_seen: dict[str, float]):
+    """Raise once a job has been processing, or unreachable, for longer than LLM_JOB_TIMEOUT.
+
+    Queued jobs wait for a free document slot on the LLM service and are not timed.
+    """
+    now = time.monotonic()
+    if status is not None:
+        last_seen[job_id] = now
+    elif now - last_seen[job_id] > LLM_JOB_TIMEOUT:
+        raise TimeoutError(f"LLM service did not answer for job {job_id} in {LLM_JOB_TIMEOUT}s")
+    if status == "processing":
+        started.setdefault(job_id, now)
+    if job_id in started and now - started[job_id] > LLM_JOB_TIMEOUT:
+        raise TimeoutError(f"LLM job {job_id} did not finish in {LLM_JOB_TIMEOUT}s")
+
+
+def _without_ocr_text(value: Any) -> Any:
+    """Copy of an LLM response without the per-page OCR text, which is stored once per page instead."""
+    if isinstance(value, dict):
+        return {k: _without_ocr_text(v) for k, v in value.items() if k != "ocr_text"}
+    if isinstance(value, list):
+        return [_without_ocr_text(v) for v in value]
+    return value
+
+
+def _store_page_results(db, doc_file: DocumentFile, raw_response: dict):
+    page_results = _parse_llm_response(raw_response)
+    stored_response = _without_ocr_text(raw_response)
+    for page_key, page_data in page_results.items():
+        try:
+            page_num = int(page_key)
+        except (ValueError, TypeError):
+            page_num = 1
+
+        classification = page_data.get("classification", {}) if isinstance(page_data, dict) else {}
+        extraction = page_data.get("extraction", []) if isinstance(page_data, dict) else []
+        ocr_text = page_data.get("ocr_text") if isinstance(page_data, dict) else None
+
+        db.add(
+            ExtractionResult(
+                document_file_id=doc_file.id,
+                page_number=page_num,
+                classification=classification,
+                extracted_entities=extraction,
+                raw_response=stored_response,
+                confidence_score=classification.get("score") if classification else None,
+                model_used=classification.get("technique", "openai") if classification else "openai",
+                status="completed",
+                ocr_text=ocr_text,
+            )
+        )
+
+    doc_file.status = "completed"
+
+
+def _store_failure(db, doc_file: DocumentFile, exc: Exception):
+    err = f"Failed to process {doc_file.original_filename}: {exc}"
+    logger.error(err)
+    db.add(
+        ExtractionResult(
+            document_file_id=doc_file.id,
+            page_number=1,
+            raw_response={"error": err},
+            status="failed",
+            error_message=err,
+        )
+    )
+    doc_file.status = "failed"
+
+
 def process_files_task(folder_id: int, template_id: Optional[int], llm_url: str):
     db = SessionLocal()
     try:
@@ -117,6 +245,8 @@ def process_files_task(folder_id: int, template_id: Optional[int], llm_url: str)
             db.commit()
             return
 
+        # Submit every file first so the LLM service can work on them concurrently.
+        pending_jobs: dict[str, DocumentFile] = {}
         for doc_file in folder.files:
             if not doc_file.file_path or not os.path.exists(doc_file.file_path):
                 logger.warning("Missing on disk: %s", doc_file.file_path)
@@ -135,52 +265,36 @@ def process_files_task(folder_id: int, template_id: Optional[int], llm_url: str)
             db.commit()
 
             try:
-                raw_response = _call_llm(
+                job_id = _submit_llm_job(
                     file_path=doc_file.file_path,
                     filename=doc_file.original_filename,
                     template_json=template_json,
                     llm_url=llm_url,
                 )
-
-                page_results = _parse_llm_response(raw_response)
-                for page_key, page_data in page_results.items():
-                    try:
-                        page_num = int(page_key)
-                    except (ValueError, TypeError):
-                        page_num = 1
-
-                    classification = page_data.get("classification", {}) if isinstance(page_data, dict) else {}
-                    extraction = page_data.get("extraction", []) if isinstance(page_data, dict) else []
-
-                    db.add(
-                        ExtractionResult(
-                            document_file_id=doc_file.id,
-                            page_number=page_num,
-                            classification=classification,
-                            extracted_entities=extraction,
-                            raw_response=raw_response,
-                            confidence_score=classification.get("score") if classification else None,
-                            model_used=classification.get("technique", "openai") if classification else "openai",
-                            status="completed",
-                        )
-                    )
-
-                doc_file.status = "completed"
+                pending_jobs[job_id] = doc_file
             except Exception as exc:
-                err = f"Failed to process {doc_file.original_filename}: {exc}"
-                logger.error(err)
-                db.add(
-                    ExtractionResult(
-                        document_file_id=doc_file.id,
-                        page_number=1,
-                        raw_response={"error": err},
-                        status="failed",
-                        error_message=err,
-                    )
-                )
-                doc_file.status = "failed"
+                _store_failure(db, doc_file, exc)
+                db.commit()
 
-            db.commit()
+        # Each job is timed from when the LLM service starts processing it.
+        started: dict[str, float] = {}
+        last_seen = {job_id: time.monotonic() for job_id in pending_jobs}
+        while pending_jobs:
+            for job_id, doc_file in list(pending_jobs.items()):
+                try:
+                    status, raw_response = _fetch_llm_job(job_id, llm_url)
+                    if raw_response is None:
+                        _check_llm_job_timeout(job_id, status, started, last_seen)
+                        continue
+                    _store_page_results(db, doc_file, raw_response)
+                except Exception as exc:
+                    _store_failure(db, doc_file, exc)
+
+                del pending_jobs[job_id]
+                db.commit()
+
+            if pending_jobs:
+                time.sleep(LLM_JOB_POLL_INTERVAL)
 
         statuses = [f.status for f in folder.files]
         if statuses and all(s == "completed" for s in statuses):
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -19,3 +19,14 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def ensure_column(table_name: str, column_name: str, ddl_type: str) -> None:
+    """Add a column that create_all() cannot add to an already existing table."""
+    inspector = inspect(engine)
+    if table_name not in inspector.get_table_names():
+        return
+    if column_name in {column["name"] for column in inspector.get_columns(table_name)}:
+        return
+    with engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {ddl_type}"))
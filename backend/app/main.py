@@ -4,9 +4,10 @@ from flask import Flask, jsonify, send_from_directory
 from flask_cors import CORS
 
 from app.api import admin, documents, folders, process, templates
-from app.db.database import Base, engine
+from app.db.database import Base, engine, ensure_column
 
 Base.metadata.create_all(bind=engine)
+ensure_column("extraction_results", "ocr_text", "TEXT")
 
 
 def create_app() -> Flask:
@@ -104,6 +104,7 @@ class ExtractionResult(Base):
     model_used = Column(String(100))
     status = Column(String(50), default="pending")
     error_message = Column(Text)
+    ocr_text = Column(Text)  # page text the classification was made from; training data for the page classifier
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
     document_file = relationship("DocumentFile", back_populates="extractions")
@@ -0,0 +1,156 @@
+"""Train the local page classifier from stored extraction results.
+
+    python -m app.services.page_classifier train --output models/page_classifier.joblib
+
+Reads the (ocr_text, class_name) pairs of completed ExtractionResult rows, fits a TF-IDF +
+logistic regression pipeline, and writes the model bundle plus a JSON accuracy/latency report
+next to it. Point the LLM service's PAGE_CLASSIFIER_MODEL_PATH at the bundle to serve it.
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Optional
+
+import joblib
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import accuracy_score, classification_report, f1_score
+from sklearn.model_selection import train_test_split
+from sklearn.pipeline import Pipeline
+
+from app.db.database import SessionLocal
+from app.models.models import ExtractionResult
+
+logger = logging.getLogger(__name__)
+
+# Results produced by a local classifier are not used as labels, so the model never trains on its own output.
+LOCAL_TECHNIQUES = ("page_model", "tfidf")
+
+
+def load_examples(db, min_chars: int = 20) -> tuple[list[str], list[str]]:
+    """Deduplicated (text, label) pairs from completed results that carry OCR text and an LLM label."""
+    rows = (
+        db.query(ExtractionResult.ocr_text, ExtractionResult.classification)
+        .filter(ExtractionResult.status == "completed", ExtractionResult.ocr_text.isnot(None))
+        .all()
+    )
+    labels_by_text: dict[str, str] = {}
+    for ocr_text, classification in rows:
+        if not isinstance(classification, dict) or classification.get("manual_check"):
+            continue
+        class_name = (classification.get("class_name") or "").strip()
+        technique = str(classification.get("technique") or "")
+        if not class_name or technique.startswith(LOCAL_TECHNIQUES):
+            continue
+        text = (ocr_text or "").strip()
+        if len(text) >= min_chars:
+            labels_by_text[text] = class_name
+    return list(labels_by_text.keys()), list(labels_by_text.values())
+
+
+def build_pipeline() -> Pipeline:
+    return Pipeline(
+        [
+            ("tfidf", TfidfVectorizer(sublinear_tf=True, ngram_range=(1, 2), min_df=2, max_features=50000)),
+            ("model", LogisticRegression(max_iter=1000, class_weight="balanced")),
+        ]
+    )
+
+
+def latency_report(pipeline: Pipeline, texts: list[str]) -> dict:
+    """Single-page prediction latency, as the LLM service calls the model once per page."""
+    timings = []
+    for text in texts[:500]:
+        start = time.perf_counter()
+        pipeline.predict_proba([text])
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        "pages": len(timings),
+        "mean_ms": statistics.mean(timings) * 1000 if timings else 0.0,
+        "p95_ms": timings[int(len(timings) * 0.95) - 1] * 1000 if timings else 0.0,
+    }
+
+
+def train(output: str, test_size: float = 0.2, min_per_class: int = 5, seed: int = 42) -> Optional[dict]:
+    db = SessionLocal()
+    try:
+        texts, labels = load_examples(db)
+    finally:
+        db.close()
+
+    counts = Counter(labels)
+    kept = {label for label, count in counts.items() if count >= min_per_class}
+    dropped = {label: count for label, count in counts.items() if label not in kept}
+    examples = [(text, label) for text, label in zip(texts, labels) if label in kept]
+    if len(kept) < 2:
+        logger.error("Need at least two classes with %d examples each, found %s", min_per_class, dict(counts))
+        return None
+
+    train_texts, test_texts, train_labels, test_labels = train_test_split(
+        [text for text, _ in examples],
+        [label for _, label in examples],
+        test_size=test_size,
+        random_state=seed,
+        stratify=[label for _, label in examples],
+    )
+
+    pipeline = build_pipeline()
+    start = time.perf_counter()
+    pipeline.fit(train_texts, train_labels)
+    fit_seconds = time.perf_counter() - start
+
+    predictions = pipeline.predict(test_texts)
+    report = {
+        "trained_at": datetime.now(timezone.utc).isoformat(),
+        "examples": len(examples),
+        "train_examples": len(train_texts),
+        "test_examples": len(test_texts),
+        "classes": dict(Counter(label for _, label in examples)),
+        "dropped_classes": dropped,
+        "accuracy": accuracy_score(test_labels, predictions),
+        "macro_f1": f1_score(test_labels, predictions, average="macro"),
+        "per_class": classification_report(test_labels, predictions, output_dict=True, zero_division=0),
+        "fit_seconds": fit_seconds,
+        "latency": latency_report(pipeline, test_texts),
+    }
+
+    # Refit on every example for the served model; the report describes the held-out evaluation.
+    pipeline.fit([text for text, _ in examples], [label for _, label in examples])
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    joblib.dump({"pipeline": pipeline, "trained_at": report["trained_at"], "report": report}, output)
+    with open(f"{output}.report.json", "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    logger.info(
+        "Page classifier saved to %s: %d examples, %d classes, accuracy %.3f, macro F1 %.3f, %.2f ms/page",
+        output, report["examples"], len(kept), report["accuracy"], report["macro_f1"], report["latency"]["mean_ms"],
+    )
+    return report
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Local page classifier tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    train_parser = subparsers.add_parser("train", help="fit the classifier on stored extraction results")
+    train_parser.add_argument("--output", default=os.getenv("PAGE_CLASSIFIER_MODEL_PATH", "models/page_classifier.joblib"))
+    train_parser.add_argument("--test-size", type=float, default=0.2)
+    train_parser.add_argument("--min-per-class", type=int, default=5)
+    train_parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    report = train(args.output, args.test_size, args.min_per_class, args.seed)
+    if report is None:
+        raise SystemExit(1)
+    print(json.dumps({k: v for k, v in report.items() if k != "per_class"}, indent=2))
+
+
+if __name__ == "__main__":
+    main()